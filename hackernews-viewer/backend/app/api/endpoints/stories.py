@@ -1,43 +1,59 @@
 """API endpoints for stories and comments."""
-from typing import List, Optional
+from typing import Iterator, List, Optional
+
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlmodel import Session
 
 from app.core.database import get_db
 from app.db import crud
 from app.services.hackernews import refresh_hackernews_data
+from app.utils.cache import top_stories_cache
 
 router = APIRouter()
 
+_STORY_KEYS = ("id", "hn_id", "title", "url", "score", "time", "by", "descendants", "text", "type")
+_COMMENT_KEYS = ("id", "hn_id", "text", "time", "by", "level", "parent_id")
+
+
+def _stream_comments(bind, story_id: int, limit: int) -> Iterator[bytes]:
+    """Stream a story's comments as a JSON array, one fetched chunk at a time.
+
+    The request session is closed before a streaming body is sent, so the rows
+    are read through a session owned by the generator.
+    """
+    with Session(bind) as db:
+        yield b"["
+        separator = b""
+        for chunk in crud.stream_top_comments_for_story_rows(db, story_id, limit=limit):
+            yield separator + b",".join(orjson.dumps(dict(zip(_COMMENT_KEYS, row))) for row in chunk)
+            separator = b","
+        yield b"]"
+
 
-@router.get("/top")
-async def get_top_stories(
+@router.get("/top", response_class=ORJSONResponse)
+def get_top_stories(
     limit: int = Query(5, ge=1, le=10),
     db: Session = Depends(get_db)
 ):
     """Get top stories."""
-    stories = crud.get_top_stories(db, limit=limit)
+    cached = top_stories_cache.get(limit)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
-    result = []
-    for story in stories:
-        result.append({
-            "id": story.story_id,
-            "hn_id": story.hn_id,
-            "title": story.title,
-            "url": story.url,
-            "score": story.score,
-            "time": story.time.isoformat() if story.time else None,
-            "by": story.user.username if story.user else None,
-            "descendants": story.descendants,
-            "text": story.text,
-            "type": story.type
-        })
+    version = top_stories_cache.version()
+    rows = crud.get_top_stories_rows(db, limit=limit)
     
-    return result
+    result = [dict(zip(_STORY_KEYS, row)) for row in rows]
+    
+    response = ORJSONResponse(result)
+    top_stories_cache.set(limit, response.body, version)
+    return response
 
 
-@router.get("/{story_id}")
-async def get_story(
+@router.get("/{story_id}", response_class=ORJSONResponse)
+def get_story(
     story_id: int,
     db: Session = Depends(get_db)
 ):
@@ -46,24 +62,22 @@ async def get_story(
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
     
-    result = {
+    return ORJSONResponse({
         "id": story.story_id,
         "hn_id": story.hn_id,
         "title": story.title,
         "url": story.url,
         "score": story.score,
-        "time": story.time.isoformat() if story.time else None,
+        "time": story.time,
         "by": story.user.username if story.user else None,
         "descendants": story.descendants,
         "text": story.text,
-        "type": story.type
-    }
-    
-    return result
+        "type": story.type,
+    })
 
 
-@router.get("/{story_id}/comments")
-async def get_story_comments(
+@router.get("/{story_id}/comments", response_class=ORJSONResponse)
+def get_story_comments(
     story_id: int,
     limit: int = Query(10, ge=1, le=20),
     db: Session = Depends(get_db)
@@ -73,18 +87,7 @@ async def get_story_comments(
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
     
-    comments = crud.get_top_comments_for_story(db, story_id, limit=limit)
-    
-    result = []
-    for comment in comments:
-        result.append({
-            "id": comment.comment_id,
-            "hn_id": comment.hn_id,
-            "text": comment.text,
-            "time": comment.time.isoformat() if comment.time else None,
-            "by": comment.user.username if comment.user else None,
-            "level": comment.level,
-            "parent_id": comment.parent_id
-        })
-    
-    return result
+    return StreamingResponse(
+        _stream_comments(db.get_bind(), story_id, limit),
+        media_type="application/json"
+    )
@@ -3,21 +3,28 @@ import os
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response
 from sqlmodel import Session
 
 from app.core.database import get_db
 from app.db import crud
 from app.services.hackernews import refresh_hackernews_data
 from app.utils import backup
+from app.utils.cache import invalidate_responses, system_status_cache
 
 router = APIRouter()
 
 
-@router.get("/status")
-async def get_system_status(
+@router.get("/status", response_class=ORJSONResponse)
+def get_system_status(
     db: Session = Depends(get_db)
 ):
     """Get system status information."""
+    cached = system_status_cache.get(None)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    version = system_status_cache.version()
     last_refresh = crud.get_last_refresh(db)
     
     result = {
@@ -28,7 +35,7 @@ async def get_system_status(
     if last_refresh:
         result["last_refresh"] = {
             "refresh_id": last_refresh.refresh_id,
-            "refresh_time": last_refresh.refresh_time.isoformat(),
+            "refresh_time": last_refresh.refresh_time,
             "stories_refreshed": last_refresh.stories_refreshed,
             "comments_refreshed": last_refresh.comments_refreshed,
             "status": last_refresh.status,
@@ -47,11 +54,13 @@ async def get_system_status(
             "error": str(e)
         }
     
-    return result
+    response = ORJSONResponse(result)
+    system_status_cache.set(None, response.body, version)
+    return response
 
 
-@router.post("/refresh")
-async def trigger_refresh(
+@router.post("/refresh", response_class=ORJSONResponse)
+def trigger_refresh(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
@@ -75,8 +84,8 @@ async def trigger_refresh(
         )
 
 
-@router.get("/backups")
-async def list_database_backups():
+@router.get("/backups", response_class=ORJSONResponse)
+def list_database_backups():
     """List all available database backups."""
     try:
         backups = backup.list_backups()
@@ -91,13 +100,14 @@ async def list_database_backups():
         )
 
 
-@router.post("/restore")
-async def restore_database(
+@router.post("/restore", response_class=ORJSONResponse)
+def restore_database(
     filename: str = Query(..., description="Backup filename to restore from")
 ):
     """Restore the database from a backup file."""
     try:
         result = backup.restore_from_backup(filename)
+        invalidate_responses()
         return {
             "status": "success",
             "message": f"Database restored from backup: {filename}",
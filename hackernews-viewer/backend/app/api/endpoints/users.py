@@ -1,5 +1,6 @@
 """API endpoints for users."""
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlmodel import Session
 
 from app.core.database import get_db
@@ -8,8 +9,8 @@ from app.db import crud
 router = APIRouter()
 
 
-@router.get("/{username}")
-async def get_user(
+@router.get("/{username}", response_class=ORJSONResponse)
+def get_user(
     username: str,
     db: Session = Depends(get_db)
 ):
@@ -22,8 +23,8 @@ async def get_user(
         "id": user.user_id,
         "username": user.username,
         "karma": user.karma,
-        "created_time": user.created_time.isoformat() if user.created_time else None,
+        "created_time": user.created_time,
         "about": user.about
     }
     
-    return result
+    return ORJSONResponse(result)
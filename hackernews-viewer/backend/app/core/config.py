@@ -1,6 +1,7 @@
 """Application configuration."""
 import os
 from pathlib import Path
+from typing import FrozenSet
 from pydantic_settings import BaseSettings
 
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
@@ -18,8 +19,17 @@ class Settings(BaseSettings):
     
     TOP_STORIES_LIMIT: int = 5
     TOP_COMMENTS_LIMIT: int = 10
+    HN_FETCH_CONCURRENCY: int = 16
+    REFRESH_PRECHECK_TTL: float = 60.0
+    
+    TOP_STORIES_CACHE_TTL: float = 10.0
+    SYSTEM_STATUS_CACHE_TTL: float = 5.0
+    
+    LOG_REQUEST_BODY: bool = False
+    LOG_HEADER_ALLOWLIST: FrozenSet[str] = frozenset({"host", "user-agent", "content-type", "x-request-id"})
     
     BACKUP_DIR: str = os.getenv("BACKUP_DIR", f"{DATA_DIR}/backups")
+    BACKUP_COMPACT: bool = True
     
     class Config:
         """Pydantic config."""
@@ -1,15 +1,49 @@
 """Database connection and session management."""
+from sqlalchemy import event
 from sqlmodel import Session, SQLModel, create_engine
-from sqlalchemy.pool import StaticPool
 
 from app.core.config import settings
 
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    pool_size=10,
+    max_overflow=20,
+    query_cache_size=1200,
 )
 
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Tune every new SQLite connection for concurrent reads and cheaper commits."""
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def init_db(bind=engine) -> None:
+    """Create any missing tables and indexes.
+    
+    ``create_all`` skips a table that already exists together with its indexes,
+    so indexes added to an existing table are created one by one as well;
+    ``checkfirst`` makes this a no-op once they exist.
+    """
+    from app.db import models  # noqa: F401  Registers the tables on the metadata.
+    
+    SQLModel.metadata.create_all(bind=bind)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
 
 
 def get_db():
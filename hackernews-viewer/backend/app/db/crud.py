@@ -1,7 +1,17 @@
-"""CRUD operations for the HackerNews Viewer database."""
+"""CRUD operations for the HackerNews Viewer database.
+
+The single-record ``create_*``, ``update_*`` and ``link_story_comment`` helpers
+and ``log_refresh`` commit their own changes. The helpers used to write a
+refresh in one transaction (``create_user``, ``upsert_story``,
+``mark_top_stories``, ``upsert_comments_bulk`` and ``link_story_comments_bulk``)
+only flush or execute, and the caller commits.
+"""
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Iterator, Sequence, Union
 
+from sqlalchemy import Row, func, insert, lambda_stmt, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload, selectinload
 from sqlmodel import Session, select
 
 from app.db.models import DimUser, DimStory, DimComment, FactStoryComment, FactRefreshLog
@@ -9,29 +19,30 @@ from app.db.models import DimUser, DimStory, DimComment, FactStoryComment, FactR
 
 def get_user(db: Session, user_id: int) -> Optional[DimUser]:
     """Get a user by ID."""
-    result = db.exec(select(DimUser).where(DimUser.user_id == user_id)).first()
+    result = db.exec(lambda_stmt(lambda: select(DimUser).where(DimUser.user_id == user_id))).scalar_one_or_none()
     return result
 
 
 def get_user_by_username(db: Session, username: str) -> Optional[DimUser]:
     """Get a user by username."""
-    result = db.exec(select(DimUser).where(DimUser.username == username)).first()
+    result = db.exec(lambda_stmt(lambda: select(DimUser).where(DimUser.username == username))).scalar_one_or_none()
     return result
 
 
 def create_user(db: Session, username: str, karma: Optional[int] = None,
                 created_time: Optional[datetime] = None, about: Optional[str] = None) -> DimUser:
-    """Create a new user."""
+    """Create a new user.
+
+    The user is flushed so that its ID is assigned; the caller commits.
+    """
     db_user = DimUser(
         username=username,
         karma=karma,
         created_time=created_time,
-        about=about,
-        last_updated=datetime.utcnow()
+        about=about
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()
     return db_user
 
 
@@ -41,7 +52,6 @@ def update_user(db: Session, user_id: int, data: Dict[str, Any]) -> Optional[Dim
     if db_user:
         for key, value in data.items():
             setattr(db_user, key, value)
-        db_user.last_updated = datetime.utcnow()
         db.commit()
         db.refresh(db_user)
     return db_user
@@ -49,22 +59,49 @@ def update_user(db: Session, user_id: int, data: Dict[str, Any]) -> Optional[Dim
 
 def get_story(db: Session, story_id: int) -> Optional[DimStory]:
     """Get a story by ID."""
-    result = db.exec(select(DimStory).where(DimStory.story_id == story_id)).first()
+    result = db.exec(lambda_stmt(lambda: select(DimStory).where(DimStory.story_id == story_id))).scalar_one_or_none()
     return result
 
 
 def get_story_by_hn_id(db: Session, hn_id: int) -> Optional[DimStory]:
     """Get a story by HackerNews ID."""
-    result = db.exec(select(DimStory).where(DimStory.hn_id == hn_id)).first()
+    result = db.exec(lambda_stmt(lambda: select(DimStory).where(DimStory.hn_id == hn_id))).scalar_one_or_none()
     return result
 
 
 def get_top_stories(db: Session, limit: int = 5) -> List[DimStory]:
     """Get top stories."""
-    results = db.exec(select(DimStory).where(DimStory.is_top == True).order_by(DimStory.score.desc()).limit(limit)).all()
+    statement = (
+        select(DimStory)
+        .options(selectinload(DimStory.user))
+        .where(DimStory.is_top == True)
+        .order_by(DimStory.score.desc())
+        .limit(limit)
+    )
+    results = db.exec(statement).all()
     return results if results else []
 
 
+def get_top_stories_rows(db: Session, limit: int = 5) -> List[Row]:
+    """Get top stories as plain rows, skipping ORM entity construction.
+
+    Each row is ``(story_id, hn_id, title, url, score, time, username,
+    descendants, text, type)``.
+    """
+    statement = (
+        select(
+            DimStory.story_id, DimStory.hn_id, DimStory.title, DimStory.url,
+            DimStory.score, DimStory.time, DimUser.username,
+            DimStory.descendants, DimStory.text, DimStory.type
+        )
+        .join(DimUser, DimStory.by_user_id == DimUser.user_id, isouter=True)
+        .where(DimStory.is_top == True)
+        .order_by(DimStory.score.desc())
+        .limit(limit)
+    )
+    return db.exec(statement).all()
+
+
 def create_story(db: Session, hn_id: int, title: str, url: Optional[str] = None,
                 score: Optional[int] = None, time: Optional[datetime] = None,
                 by_user_id: Optional[int] = None, descendants: Optional[int] = None,
@@ -81,8 +118,7 @@ def create_story(db: Session, hn_id: int, title: str, url: Optional[str] = None,
         descendants=descendants,
         text=text,
         type=type,
-        is_top=is_top,
-        last_updated=datetime.utcnow()
+        is_top=is_top
     )
     db.add(db_story)
     db.commit()
@@ -90,41 +126,70 @@ def create_story(db: Session, hn_id: int, title: str, url: Optional[str] = None,
     return db_story
 
 
+def upsert_story(db: Session, hn_id: int, title: str, url: Optional[str] = None,
+                score: Optional[int] = None, time: Optional[datetime] = None,
+                by_user_id: Optional[int] = None, descendants: Optional[int] = None,
+                text: Optional[str] = None, type: Optional[str] = None,
+                is_top: bool = False) -> int:
+    """Create a story, or update its mutable fields if the HackerNews ID exists.
+
+    Runs as a single ``INSERT ... ON CONFLICT(hn_id) DO UPDATE`` statement and
+    returns the story ID. The caller commits.
+    """
+    statement = sqlite_insert(DimStory).values(
+        hn_id=hn_id,
+        title=title,
+        url=url,
+        score=score,
+        time=time,
+        by_user_id=by_user_id,
+        descendants=descendants,
+        text=text,
+        type=type,
+        is_top=is_top
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[DimStory.hn_id],
+        set_={
+            "title": statement.excluded.title,
+            "url": statement.excluded.url,
+            "score": statement.excluded.score,
+            "descendants": statement.excluded.descendants,
+            "text": statement.excluded.text,
+            "is_top": statement.excluded.is_top,
+            "last_updated": func.now()
+        }
+    ).returning(DimStory.story_id)
+    return db.exec(statement).scalar_one()
+
+
 def update_story(db: Session, story_id: int, data: Dict[str, Any]) -> Optional[DimStory]:
     """Update a story."""
     db_story = get_story(db, story_id)
     if db_story:
         for key, value in data.items():
             setattr(db_story, key, value)
-        db_story.last_updated = datetime.utcnow()
         db.commit()
         db.refresh(db_story)
     return db_story
 
 
 def mark_top_stories(db: Session, story_ids: List[int]) -> None:
-    """Mark stories as top stories."""
-    stories_result = db.exec(select(DimStory)).all()
-    for story in stories_result:
-        story.is_top = False
-    
-    for story_id in story_ids:
-        story = get_story(db, story_id)
-        if story:
-            story.is_top = True
-    
-    db.commit()
+    """Mark stories as top stories. The caller commits."""
+    db.exec(update(DimStory).where(DimStory.is_top == True).values(is_top=False))
+    if story_ids:
+        db.exec(update(DimStory).where(DimStory.story_id.in_(story_ids)).values(is_top=True))
 
 
 def get_comment(db: Session, comment_id: int) -> Optional[DimComment]:
     """Get a comment by ID."""
-    result = db.exec(select(DimComment).where(DimComment.comment_id == comment_id)).first()
+    result = db.exec(lambda_stmt(lambda: select(DimComment).where(DimComment.comment_id == comment_id))).scalar_one_or_none()
     return result
 
 
 def get_comment_by_hn_id(db: Session, hn_id: int) -> Optional[DimComment]:
     """Get a comment by HackerNews ID."""
-    result = db.exec(select(DimComment).where(DimComment.hn_id == hn_id)).first()
+    result = db.exec(lambda_stmt(lambda: select(DimComment).where(DimComment.hn_id == hn_id))).scalar_one_or_none()
     return result
 
 
@@ -132,6 +197,7 @@ def get_top_comments_for_story(db: Session, story_id: int, limit: int = 10) -> L
     """Get top comments for a story."""
     statement = (
         select(DimComment)
+        .options(joinedload(DimComment.user))
         .join(FactStoryComment, FactStoryComment.comment_id == DimComment.comment_id)
         .where(FactStoryComment.story_id == story_id)
         .order_by(FactStoryComment.comment_rank)
@@ -140,6 +206,40 @@ def get_top_comments_for_story(db: Session, story_id: int, limit: int = 10) -> L
     return db.exec(statement).all()
 
 
+def _top_comments_rows_statement(story_id: int, limit: int):
+    """Build the column-only select behind the top-comments row helpers."""
+    return (
+        select(
+            DimComment.comment_id, DimComment.hn_id, DimComment.text, DimComment.time,
+            DimUser.username, DimComment.level, DimComment.parent_id
+        )
+        .join(FactStoryComment, FactStoryComment.comment_id == DimComment.comment_id)
+        .join(DimUser, DimComment.by_user_id == DimUser.user_id, isouter=True)
+        .where(FactStoryComment.story_id == story_id)
+        .order_by(FactStoryComment.comment_rank)
+        .limit(limit)
+    )
+
+
+def get_top_comments_for_story_rows(db: Session, story_id: int, limit: int = 10) -> List[Row]:
+    """Get top comments for a story as plain rows, skipping ORM entity construction.
+
+    Each row is ``(comment_id, hn_id, text, time, username, level, parent_id)``.
+    """
+    return db.exec(_top_comments_rows_statement(story_id, limit)).all()
+
+
+def stream_top_comments_for_story_rows(db: Session, story_id: int, limit: int = 10,
+                                       chunk_size: int = 50) -> Iterator[Sequence[Row]]:
+    """Yield top comment rows for a story in chunks of up to ``chunk_size``.
+
+    Rows are fetched from the open cursor as the chunks are consumed, with the
+    same layout as ``get_top_comments_for_story_rows``.
+    """
+    statement = _top_comments_rows_statement(story_id, limit).execution_options(yield_per=chunk_size)
+    yield from db.exec(statement).partitions()
+
+
 def create_comment(db: Session, hn_id: int, text: Optional[str] = None,
                   time: Optional[datetime] = None, by_user_id: Optional[int] = None,
                   parent_id: Optional[int] = None, level: int = 0,
@@ -152,8 +252,7 @@ def create_comment(db: Session, hn_id: int, text: Optional[str] = None,
         by_user_id=by_user_id,
         parent_id=parent_id,
         level=level,
-        is_top_comment=is_top_comment,
-        last_updated=datetime.utcnow()
+        is_top_comment=is_top_comment
     )
     db.add(db_comment)
     db.commit()
@@ -161,13 +260,34 @@ def create_comment(db: Session, hn_id: int, text: Optional[str] = None,
     return db_comment
 
 
+def upsert_comments_bulk(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """Create or update many comments with one multi-row upsert.
+
+    Each row holds the ``create_comment`` keyword arguments. Comments whose
+    HackerNews ID already exists get their text and level updated. Returns the
+    comment IDs in the same order as ``rows``. The caller commits.
+    """
+    if not rows:
+        return []
+    statement = sqlite_insert(DimComment)
+    statement = statement.on_conflict_do_update(
+        index_elements=[DimComment.hn_id],
+        set_={
+            "text": statement.excluded.text,
+            "level": statement.excluded.level,
+            "last_updated": func.now()
+        }
+    ).returning(DimComment.hn_id, DimComment.comment_id)
+    ids_by_hn_id = dict(db.exec(statement, params=rows).all())
+    return [ids_by_hn_id[row["hn_id"]] for row in rows]
+
+
 def update_comment(db: Session, comment_id: int, data: Dict[str, Any]) -> Optional[DimComment]:
     """Update a comment."""
     db_comment = get_comment(db, comment_id)
     if db_comment:
         for key, value in data.items():
             setattr(db_comment, key, value)
-        db_comment.last_updated = datetime.utcnow()
         db.commit()
         db.refresh(db_comment)
     return db_comment
@@ -178,8 +298,7 @@ def link_story_comment(db: Session, story_id: int, comment_id: int, comment_rank
     db_fact = FactStoryComment(
         story_id=story_id,
         comment_id=comment_id,
-        comment_rank=comment_rank,
-        refresh_time=datetime.utcnow()
+        comment_rank=comment_rank
     )
     db.add(db_fact)
     db.commit()
@@ -187,11 +306,19 @@ def link_story_comment(db: Session, story_id: int, comment_id: int, comment_rank
     return db_fact
 
 
+def link_story_comments_bulk(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Link many stories and comments in the fact table with one executemany.
+
+    Each row holds the ``link_story_comment`` keyword arguments. The caller commits.
+    """
+    if rows:
+        db.exec(insert(FactStoryComment), params=rows)
+
+
 def log_refresh(db: Session, stories_refreshed: int, comments_refreshed: int,
                status: str, error_message: Optional[str] = None) -> FactRefreshLog:
     """Log a data refresh operation."""
     db_log = FactRefreshLog(
-        refresh_time=datetime.utcnow(),
         stories_refreshed=stories_refreshed,
         comments_refreshed=comments_refreshed,
         status=status,
@@ -205,5 +332,10 @@ def log_refresh(db: Session, stories_refreshed: int, comments_refreshed: int,
 
 def get_last_refresh(db: Session) -> Optional[FactRefreshLog]:
     """Get the last refresh log entry."""
-    result = db.exec(select(FactRefreshLog).order_by(FactRefreshLog.refresh_time.desc())).first()
+    statement = lambda_stmt(
+        lambda: select(FactRefreshLog)
+        .order_by(FactRefreshLog.refresh_time.desc(), FactRefreshLog.refresh_id.desc())
+        .limit(1)
+    )
+    result = db.exec(statement).scalars().first()
     return result
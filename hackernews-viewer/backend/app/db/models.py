@@ -1,7 +1,8 @@
 """SQLite database models for the HackerNews Viewer."""
 from datetime import datetime
 from typing import List, Optional
-from sqlmodel import Field, Relationship, Session, SQLModel, create_engine
+from sqlalchemy import Column, DateTime, Index, func
+from sqlmodel import Field, Relationship, SQLModel
 
 
 class DimUser(SQLModel, table=True):
@@ -13,7 +14,12 @@ class DimUser(SQLModel, table=True):
     karma: Optional[int] = Field(default=None)
     created_time: Optional[datetime] = Field(default=None)
     about: Optional[str] = Field(default=None)
-    last_updated: datetime = Field(default_factory=datetime.utcnow)
+    last_updated: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False
+        )
+    )
 
     stories: List["DimStory"] = Relationship(back_populates="user")
     comments: List["DimComment"] = Relationship(back_populates="user")
@@ -22,6 +28,7 @@ class DimUser(SQLModel, table=True):
 class DimStory(SQLModel, table=True):
     """Dimension table for stories."""
     __tablename__ = "dim_stories"
+    __table_args__ = (Index("ix_stories_top_score", "is_top", "score"),)
 
     story_id: Optional[int] = Field(default=None, primary_key=True)
     hn_id: int = Field(unique=True, nullable=False)
@@ -33,7 +40,12 @@ class DimStory(SQLModel, table=True):
     descendants: Optional[int] = Field(default=None)  # Total comment count
     text: Optional[str] = Field(default=None)  # For Ask HN, etc.
     type: Optional[str] = Field(default=None)  # Type of item (story, job, etc.)
-    last_updated: datetime = Field(default_factory=datetime.utcnow)
+    last_updated: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False
+        )
+    )
     is_top: bool = Field(default=False)  # Flag for top stories
 
     user: Optional[DimUser] = Relationship(back_populates="stories")
@@ -51,7 +63,12 @@ class DimComment(SQLModel, table=True):
     by_user_id: Optional[int] = Field(default=None, foreign_key="dim_users.user_id")
     parent_id: Optional[int] = Field(default=None)  # Parent comment ID
     level: int = Field(default=0)  # Nesting level
-    last_updated: datetime = Field(default_factory=datetime.utcnow)
+    last_updated: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False
+        )
+    )
     is_top_comment: bool = Field(default=False)  # Flag for top-level comments
 
     user: Optional[DimUser] = Relationship(back_populates="comments")
@@ -61,12 +78,16 @@ class DimComment(SQLModel, table=True):
 class FactStoryComment(SQLModel, table=True):
     """Fact table linking stories and comments."""
     __tablename__ = "fact_story_comments"
+    __table_args__ = (Index("ix_fsc_story_rank", "story_id", "comment_rank"),)
 
     fact_id: Optional[int] = Field(default=None, primary_key=True)
     story_id: int = Field(foreign_key="dim_stories.story_id", nullable=False)
     comment_id: int = Field(foreign_key="dim_comments.comment_id", nullable=False)
     comment_rank: Optional[int] = Field(default=None)  # Rank within the story
-    refresh_time: datetime = Field(default_factory=datetime.utcnow)
+    refresh_time: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
+    )
 
     story: DimStory = Relationship(back_populates="story_comments")
     comment: DimComment = Relationship(back_populates="story_comments")
@@ -75,17 +96,14 @@ class FactStoryComment(SQLModel, table=True):
 class FactRefreshLog(SQLModel, table=True):
     """Fact table for refresh operations."""
     __tablename__ = "fact_refresh_log"
+    __table_args__ = (Index("ix_refresh_time_desc", "refresh_time"),)
 
     refresh_id: Optional[int] = Field(default=None, primary_key=True)
-    refresh_time: datetime = Field(default_factory=datetime.utcnow)
+    refresh_time: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
+    )
     stories_refreshed: int = Field(default=0)
     comments_refreshed: int = Field(default=0)
     status: str = Field(nullable=False)  # Success/failure
     error_message: Optional[str] = Field(default=None)
-
-
-def init_db(db_url="sqlite:///hackernews.db"):
-    """Initialize the database."""
-    engine = create_engine(db_url, connect_args={"check_same_thread": False})
-    SQLModel.metadata.create_all(engine)
-    return engine
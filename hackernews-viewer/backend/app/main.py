@@ -1,23 +1,36 @@
 """Main FastAPI application."""
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from sqlmodel import Session
 import logging
-import json
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
 from app.api.endpoints import stories, users, system
 from app.core.config import settings
-from app.core.database import get_db, engine
-from app.db.models import SQLModel
+from app.core.database import get_db, init_db
 from app.middleware.logging_middleware import APILoggingMiddleware
+from app.services.hackernews import close_http_client
+
+init_db()
+
+_STORIES_PREFIX = f"{settings.API_V1_STR}/stories"
+_USERS_PREFIX = f"{settings.API_V1_STR}/users"
+_SYSTEM_PREFIX = f"{settings.API_V1_STR}/system"
 
-SQLModel.metadata.create_all(bind=engine)
 
-app = FastAPI(title="HackerNews Viewer API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the HTTP client shared by the HackerNews services on shutdown."""
+    yield
+    await close_http_client()
+
+app = FastAPI(title="HackerNews Viewer API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 logs_dir = Path(settings.DATA_DIR) / "logs"
 logs_dir.mkdir(parents=True, exist_ok=True)
@@ -32,9 +45,9 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-app.include_router(stories.router, prefix=f"{settings.API_V1_STR}/stories", tags=["stories"])
-app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
-app.include_router(system.router, prefix=f"{settings.API_V1_STR}/system", tags=["system"])
+app.include_router(stories.router, prefix=_STORIES_PREFIX, tags=["stories"])
+app.include_router(users.router, prefix=_USERS_PREFIX, tags=["users"])
+app.include_router(system.router, prefix=_SYSTEM_PREFIX, tags=["system"])
 
 @app.get("/")
 async def root():
@@ -49,7 +62,7 @@ async def health():
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request, exc):
     """Log HTTP exceptions."""
-    from app.middleware.logging_middleware import logger as api_logger
+    from app.middleware.logging_middleware import LazyJSON, logger as api_logger
     
     log_dict = {
         "method": request.method,
@@ -59,13 +72,13 @@ async def http_exception_handler(request, exc):
         "detail": str(exc.detail),
         "type": "http_exception"
     }
-    api_logger.error(f"HTTP Exception: {json.dumps(log_dict)}")
+    api_logger.error("HTTP Exception: %s", LazyJSON(log_dict))
     raise exc
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
     """Log validation exceptions."""
-    from app.middleware.logging_middleware import logger as api_logger
+    from app.middleware.logging_middleware import LazyJSON, logger as api_logger
     
     log_dict = {
         "method": request.method,
@@ -74,10 +87,5 @@ async def validation_exception_handler(request, exc):
         "errors": str(exc),
         "type": "validation_error"
     }
-    api_logger.error(f"Validation Error: {json.dumps(log_dict)}")
+    api_logger.error("Validation Error: %s", LazyJSON(log_dict))
     raise exc
-
-@app.on_event("startup")
-async def startup_event():
-    """Run startup tasks."""
-    SQLModel.metadata.create_all(bind=engine)
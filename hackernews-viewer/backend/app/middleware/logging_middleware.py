@@ -1,15 +1,17 @@
 """Middleware for logging API requests and responses."""
+import atexit
+import itertools
 import time
 import logging
-from logging.handlers import RotatingFileHandler
-import json
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import queue
+import threading
 from pathlib import Path
-from typing import Callable, Dict, Any, Optional
+from typing import Dict, Any, Iterable, Optional, Tuple
 
-from fastapi import Request, Response
-from fastapi.routing import APIRoute
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+import orjson
+from starlette.datastructures import URL
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.config import settings
 
@@ -18,10 +20,87 @@ logs_dir.mkdir(parents=True, exist_ok=True)
 
 api_log_file = logs_dir / "api.log"
 
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """Rotating file handler that writes through a large buffer.
+
+    ``StreamHandler.emit`` flushes after every record; here the flush is
+    deferred until ``flush_interval`` seconds have passed, so bursts of
+    records reach the disk in a single write.
+    """
+
+    buffer_size = 64 * 1024
+    flush_interval = 0.1
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the handler with no flush pending."""
+        self._flush_timer: Optional[threading.Timer] = None
+        super().__init__(*args, **kwargs)
+
+    def _open(self):
+        """Open the log file with a ``buffer_size`` write buffer."""
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+
+    def flush(self) -> None:
+        """Schedule a flush of the buffered records if none is pending."""
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self._flush_now)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_now(self) -> None:
+        """Write the buffered records to disk."""
+        with self.lock:
+            self._flush_timer = None
+            super().flush()
+
+    def close(self) -> None:
+        """Cancel any pending flush and close the file."""
+        with self.lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        super().close()
+
+
+class LazyJSON:
+    """Log message argument that is serialized to JSON only when formatted."""
+
+    __slots__ = ("payload", "_text")
+
+    def __init__(self, payload: Dict[str, Any]):
+        """Wrap a JSON-serializable payload."""
+        self.payload = payload
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        """Serialize the payload, reusing the result if it is formatted again."""
+        if self._text is None:
+            self._text = orjson.dumps(self.payload).decode()
+        return self._text
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves message formatting to the listener thread.
+
+    ``QueueHandler.prepare`` formats each record before enqueueing it so that it
+    can be pickled; the queue here never leaves the process, so records are
+    enqueued as-is and ``LazyJSON`` arguments are serialized off the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Enqueue the record unchanged."""
+        return record
+
+
 logger = logging.getLogger("api")
 logger.setLevel(logging.INFO)
+# The listener below also writes to the console; logging through root as well
+# would format every record on the event loop.
+logger.propagate = False
 
-file_handler = RotatingFileHandler(
+file_handler = BufferedRotatingFileHandler(
     api_log_file,
     maxBytes=10 * 1024 * 1024,  # 10MB
     backupCount=5,  # Keep 5 backup files
@@ -30,95 +109,164 @@ file_handler = RotatingFileHandler(
 
 log_format = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 file_handler.setFormatter(log_format)
-logger.addHandler(file_handler)
 
+console_handler = logging.StreamHandler()
+console_handler.setFormatter(log_format)
+
+# Records are handed to a background thread so that file writes and rotation
+# checks never run on the event loop.
+log_queue: queue.Queue = queue.Queue(-1)
+logger.addHandler(DeferredQueueHandler(log_queue))
 
-class APILoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging all API requests and responses."""
+log_listener = QueueListener(log_queue, console_handler, file_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+_BODY_METHODS = frozenset({"POST", "PUT", "PATCH"})
+_MAX_BODY_LOG_BYTES = 4096
+_request_counter = itertools.count()
+_HEADER_ALLOWLIST = frozenset(name.lower().encode("latin-1") for name in settings.LOG_HEADER_ALLOWLIST)
+
+
+def _allowed_headers(raw_headers: Iterable[Tuple[bytes, bytes]]) -> Dict[str, str]:
+    """Decode only the allowlisted entries of raw ASGI headers."""
+    return {
+        name.decode("latin-1"): value.decode("latin-1")
+        for name, value in raw_headers
+        if name in _HEADER_ALLOWLIST
+    }
+
+
+class APILoggingMiddleware:
+    """ASGI middleware for logging all API requests and responses."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap the downstream ASGI application."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process a request and log the details."""
-        request_id = str(int(time.time() * 1000))
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = f"{next(_request_counter):08x}"
         
-        await self._log_request(request, request_id)
+        # With body logging on, the request is logged once the app has read
+        # its body, from the first bytes captured as they pass through.
+        body: Optional[bytearray] = None
+        if (settings.LOG_REQUEST_BODY and scope["method"] in _BODY_METHODS
+                and logger.isEnabledFor(logging.INFO)):
+            body = bytearray()
+            receive = self._tee_receive(receive, body)
+        else:
+            self._log_request(scope, request_id)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
+        response_start: Optional[Message] = None
+        process_time = 0.0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_start, process_time
+            if message["type"] == "http.response.start":
+                response_start = message
+                process_time = time.perf_counter() - start_time
+            await send(message)
         
         try:
-            response = await call_next(request)
-            
-            process_time = time.time() - start_time
-            
-            self._log_response(request, response, process_time, request_id)
-            
-            return response
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
-            process_time = time.time() - start_time
+            process_time = time.perf_counter() - start_time
             
-            self._log_error(request, exc, process_time, request_id)
+            if body is not None:
+                self._log_request(scope, request_id, body)
+            self._log_error(scope, exc, process_time, request_id)
             
             raise
+        
+        if body is not None:
+            self._log_request(scope, request_id, body)
+        if response_start is not None:
+            self._log_response(scope, response_start, process_time, request_id)
+
+    @staticmethod
+    def _tee_receive(receive: Receive, buffer: bytearray) -> Receive:
+        """Wrap ``receive`` to copy up to the first 4 KiB of the body into ``buffer``."""
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            remaining = _MAX_BODY_LOG_BYTES - len(buffer)
+            if message["type"] == "http.request" and remaining > 0:
+                buffer.extend(message.get("body", b"")[:remaining])
+            return message
+
+        return receive_wrapper
 
-    async def _log_request(self, request: Request, request_id: str) -> None:
+    def _log_request(self, scope: Scope, request_id: str,
+                     body_bytes: Optional[bytearray] = None) -> None:
         """Log the request details."""
-        client_host = request.client.host if request.client else "unknown"
+        if not logger.isEnabledFor(logging.INFO):
+            return
         
-        body = None
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body_bytes = await request.body()
-                await request._receive()
-                try:
-                    body = json.loads(body_bytes.decode())
-                except:
-                    body = body_bytes.decode()[:1000]
-            except Exception:
-                body = "Error reading body"
+        client = scope.get("client")
+        client_host = client[0] if client else "unknown"
         
         log_dict = {
             "request_id": request_id,
             "client_ip": client_host,
-            "method": request.method,
-            "url": str(request.url),
-            "path": request.url.path,
-            "headers": dict(request.headers),
-            "body": body,
+            "method": scope["method"],
+            "url": str(URL(scope=scope)),
+            "path": scope["path"],
+            "headers": _allowed_headers(scope["headers"]),
             "type": "request"
         }
         
-        logger.info(f"Request: {json.dumps(log_dict)}")
+        if body_bytes is not None:
+            try:
+                log_dict["body"] = orjson.loads(body_bytes)
+            except ValueError:
+                log_dict["body"] = body_bytes.decode(errors="replace")
+        
+        logger.info("Request: %s", LazyJSON(log_dict))
 
-    def _log_response(self, request: Request, response: Response, 
+    def _log_response(self, scope: Scope, message: Message,
                      process_time: float, request_id: str) -> None:
         """Log the response details."""
+        status_code = message["status"]
+        is_error = 400 <= status_code < 600
+        if not logger.isEnabledFor(logging.ERROR if is_error else logging.INFO):
+            return
+        
         log_dict = {
             "request_id": request_id,
-            "method": request.method,
-            "url": str(request.url),
-            "path": request.url.path,
-            "status_code": response.status_code,
+            "method": scope["method"],
+            "url": str(URL(scope=scope)),
+            "path": scope["path"],
+            "status_code": status_code,
             "process_time_ms": round(process_time * 1000, 2),
-            "headers": dict(response.headers),
+            "headers": _allowed_headers(message.get("headers", ())),
             "type": "response"
         }
         
-        if 400 <= response.status_code < 600:
-            logger.error(f"Response (Error): {json.dumps(log_dict)}")
+        if is_error:
+            logger.error("Response (Error): %s", LazyJSON(log_dict))
         else:
-            logger.info(f"Response: {json.dumps(log_dict)}")
+            logger.info("Response: %s", LazyJSON(log_dict))
 
-    def _log_error(self, request: Request, exc: Exception, 
+    def _log_error(self, scope: Scope, exc: Exception,
                   process_time: float, request_id: str) -> None:
         """Log exceptions that occur during request processing."""
+        if not logger.isEnabledFor(logging.ERROR):
+            return
+        
         log_dict = {
             "request_id": request_id,
-            "method": request.method,
-            "url": str(request.url),
-            "path": request.url.path,
+            "method": scope["method"],
+            "url": str(URL(scope=scope)),
+            "path": scope["path"],
             "error": str(exc),
             "error_type": type(exc).__name__,
             "process_time_ms": round(process_time * 1000, 2),
             "type": "error"
         }
         
-        logger.error(f"Exception during request: {json.dumps(log_dict)}")
+        logger.error("Exception during request: %s", LazyJSON(log_dict))
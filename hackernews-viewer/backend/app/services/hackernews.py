@@ -1,36 +1,104 @@
 """HackerNews API integration service."""
 import asyncio
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import importlib.util
+from datetime import datetime, timedelta
+from typing import Awaitable, Iterable, List, Dict, Any, Optional, Tuple, TypeVar
 import logging
 import os
-import shutil
+import time
 from pathlib import Path
-import sqlite3
 
 import httpx
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import Session
 
 from app.core.config import settings
 from app.db import crud, models
+from app.utils.cache import invalidate_responses
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _from_epoch(seconds: int) -> datetime:
+    """Convert a HackerNews Unix timestamp to a naive UTC datetime.
+
+    Unlike ``datetime.fromtimestamp`` this does no local time zone lookup.
+    """
+    return _EPOCH + timedelta(seconds=seconds)
+
+# HTTP/2 needs the optional ``h2`` package (``httpx[http2]``).
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Monotonic time until which the last successful local pre-refresh checks stay valid.
+_local_checks_valid_until = 0.0
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the HTTP client shared by all services.
+
+    Reusing one client keeps connections (and TLS sessions) to the HackerNews
+    API alive between refreshes. A new client is created if the previous one
+    was closed or belongs to a different event loop.
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client, if one is open."""
+    global _http_client, _http_client_loop
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        _http_client_loop = None
+
+
+async def _gather(aws: Iterable[Awaitable[T]]) -> List[T]:
+    """Run awaitables concurrently and return their results in order.
+
+    Unlike a bare ``asyncio.gather``, every awaitable has finished before the
+    first exception is re-raised, so no work is left running in the background.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
 
 class HackerNewsService:
     """Service for interacting with the HackerNews API."""
 
-    def __init__(self, db: Session):
-        """Initialize the service with a database session."""
+    def __init__(self, db: Session, client: Optional[httpx.AsyncClient] = None):
+        """Initialize the service with a database session.
+
+        Uses the shared HTTP client unless ``client`` is given, in which case the
+        caller is responsible for closing it. Without a client this must be
+        called from a running event loop.
+        """
         self.db = db
         self.base_url = settings.HACKERNEWS_API_URL
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.client = client or get_http_client()
+        self._fetch_semaphore = asyncio.Semaphore(settings.HN_FETCH_CONCURRENCY)
+        self._user_ids: Dict[str, int] = {}
 
-    async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
-        
     def _check_data_dir_access(self) -> Optional[str]:
         """Check if DATA_DIR is accessible and has proper permissions.
         
@@ -61,66 +129,54 @@ class HackerNewsService:
             logger.error(f"P1: {error_msg}")
             return error_msg
     
-    def _check_disk_space(self, min_free_percent=10) -> Optional[str]:
-        """Check if there's sufficient disk space available.
+    def _check_database(self) -> Optional[str]:
+        """Check that the database is readable and structurally sound.
+
+        Runs ``PRAGMA quick_check`` on the service's own session, which skips the
+        index cross-checks of a full integrity check. The full check runs
+        periodically from ``app.services.maintenance``.
         
-        Args:
-            min_free_percent: Minimum free disk space percentage required.
-            
         Returns:
-            Error message if disk space is low, None otherwise.
+            Error message if there's an issue, None otherwise.
         """
         try:
-            data_dir = Path(os.path.dirname(self.db.get_bind().url.database))
-            total, used, free = shutil.disk_usage(data_dir)
-            free_percent = (free / total) * 100
+            result = self.db.exec(text("PRAGMA quick_check")).scalar()
             
-            if free_percent < min_free_percent:
-                error_msg = f"Disk space critically low: {free_percent:.1f}% free, {free / (1024*1024*1024):.2f} GB"
-                logger.error(f"P1: {error_msg}")
+            if result != "ok":
+                error_msg = f"Database corruption detected: {result or 'unknown error'}"
+                logger.error(f"P0: {error_msg}")
                 return error_msg
                 
             return None
-        except Exception as e:
-            error_msg = f"Error checking disk space: {str(e)}"
-            logger.error(f"P1: {error_msg}")
+        except SQLAlchemyError as e:
+            error_msg = f"Database access error: {str(e)}"
+            logger.error(f"P0: {error_msg}")
             return error_msg
-            
-    def _check_database_integrity(self) -> Optional[str]:
-        """Check if the database is accessible and not corrupted.
+    
+    def _run_local_checks(self) -> Optional[str]:
+        """Run the data directory and database checks before a refresh.
+
+        A successful run is remembered for ``settings.REFRESH_PRECHECK_TTL``
+        seconds, during which the checks are skipped. Failures are always
+        re-checked on the next refresh.
         
         Returns:
             Error message if there's an issue, None otherwise.
         """
-        try:
-            db_path = Path(self.db.get_bind().url.database)
+        global _local_checks_valid_until
+        if time.monotonic() < _local_checks_valid_until:
+            return None
             
-            if not db_path.exists():
-                error_msg = f"Database file at {db_path} does not exist"
-                logger.error(f"P0: {error_msg}")
-                return error_msg
-                
-            conn = sqlite3.connect(str(db_path))
-            cursor = conn.cursor()
+        data_dir_error = self._check_data_dir_access()
+        if data_dir_error:
+            return f"DATA_DIR issue: {data_dir_error}"
             
-            cursor.execute("PRAGMA integrity_check")
-            result = cursor.fetchone()
-            conn.close()
+        db_integrity_error = self._check_database()
+        if db_integrity_error:
+            return f"Database issue: {db_integrity_error}"
             
-            if not result or result[0] != "ok":
-                error_msg = f"Database corruption detected in {db_path}: {result[0] if result else 'unknown error'}"
-                logger.error(f"P0: {error_msg}")
-                return error_msg
-                
-            return None
-        except sqlite3.Error as e:
-            error_msg = f"Database access error: {str(e)}"
-            logger.error(f"P0: {error_msg}")
-            return error_msg
-        except Exception as e:
-            error_msg = f"Error checking database integrity: {str(e)}"
-            logger.error(f"P0: {error_msg}")
-            return error_msg
+        _local_checks_valid_until = time.monotonic() + settings.REFRESH_PRECHECK_TTL
+        return None
     
     async def _check_api_availability(self) -> Optional[str]:
         """Check if the HackerNews API is available.
@@ -144,7 +200,8 @@ class HackerNewsService:
     async def get_item(self, item_id: int) -> Optional[Dict[str, Any]]:
         """Get an item from the HackerNews API."""
         try:
-            response = await self.client.get(f"{self.base_url}/item/{item_id}.json")
+            async with self._fetch_semaphore:
+                response = await self.client.get(f"{self.base_url}/item/{item_id}.json")
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -154,7 +211,8 @@ class HackerNewsService:
     async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
         """Get a user from the HackerNews API."""
         try:
-            response = await self.client.get(f"{self.base_url}/user/{username}.json")
+            async with self._fetch_semaphore:
+                response = await self.client.get(f"{self.base_url}/user/{username}.json")
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -172,20 +230,42 @@ class HackerNewsService:
             return []
 
     async def process_user(self, username: str) -> Optional[int]:
-        """Process a user and store in the database."""
+        """Process a user and store in the database.
+
+        Resolved user IDs are remembered for the lifetime of the service, so each
+        author is looked up at most once per refresh.
+        """
         if not username:
             return None
 
+        user_id = self._user_ids.get(username)
+        if user_id is None:
+            user_id = await self._store_user(username)
+            self._user_ids[username] = user_id
+        return user_id
+
+    async def _store_user(self, username: str) -> int:
+        """Look up a user in the database, fetching and creating it if missing."""
         db_user = crud.get_user_by_username(self.db, username)
         if db_user:
             return db_user.user_id
 
         user_data = await self.get_user(username)
+
+        # Another story or comment by the same user may have stored it meanwhile.
+        db_user = crud.get_user_by_username(self.db, username)
+        if db_user:
+            return db_user.user_id
+
+        return self._create_user(username, user_data)
+
+    def _create_user(self, username: str, user_data: Optional[Dict[str, Any]]) -> int:
+        """Create a user from its fetched item, or with just a username if there is none."""
         if not user_data:
             db_user = crud.create_user(self.db, username)
             return db_user.user_id
 
-        created_time = datetime.fromtimestamp(user_data.get("created", 0))
+        created_time = _from_epoch(user_data.get("created", 0))
         db_user = crud.create_user(
             self.db,
             username=username,
@@ -195,35 +275,59 @@ class HackerNewsService:
         )
         return db_user.user_id
 
-    async def process_story(self, story_id: int, is_top: bool = False) -> Optional[int]:
-        """Process a story and store in the database."""
-        story_data = await self.get_item(story_id)
-        if not story_data or story_data.get("type") != "story":
-            logger.warning(f"P3: Item {story_id} is not a valid story")
+    async def _fetch_new_users(self, usernames: Iterable[Optional[str]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Fetch the users that are not in the database yet, without writing anything.
+
+        The IDs of users already stored are remembered as ``process_user`` does.
+        Returns each new username with its fetched item, for ``_store_new_users``.
+        """
+        new_usernames = []
+        for username in set(usernames):
+            if not username or username in self._user_ids:
+                continue
+            db_user = crud.get_user_by_username(self.db, username)
+            if db_user:
+                self._user_ids[username] = db_user.user_id
+            else:
+                new_usernames.append(username)
+
+        users_data = await _gather(self.get_user(username) for username in new_usernames)
+        return dict(zip(new_usernames, users_data))
+
+    def _store_new_users(self, new_users: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Create the users returned by ``_fetch_new_users``. The caller commits."""
+        for username, user_data in new_users.items():
+            self._user_ids[username] = self._create_user(username, user_data)
+
+    async def process_story(self, story_id: int, is_top: bool = False) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Process a story and store in the database.
+
+        Returns:
+            ``(db_story_id, story_data)`` with the fetched item, so callers can
+            reuse it without fetching it again, or None if it is not a valid story.
+        """
+        story_data = await self._fetch_story(story_id)
+        if not story_data:
             return None
 
         by_user_id = await self.process_user(story_data.get("by"))
+        return self._upsert_story(story_data, by_user_id, is_top), story_data
 
-        db_story = crud.get_story_by_hn_id(self.db, story_id)
-        if db_story:
-            crud.update_story(
-                self.db,
-                db_story.story_id,
-                {
-                    "title": story_data.get("title", ""),
-                    "url": story_data.get("url"),
-                    "score": story_data.get("score"),
-                    "descendants": story_data.get("descendants"),
-                    "text": story_data.get("text"),
-                    "is_top": is_top
-                }
-            )
-            return db_story.story_id
+    async def _fetch_story(self, story_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch a story item, or return None if it is not a valid story."""
+        story_data = await self.get_item(story_id)
+        if not story_data or story_data.get("type") != "story":
+            logger.warning(f"P3: Item {story_id} is not a valid story")
+            return None
+        return story_data
 
-        time_value = datetime.fromtimestamp(story_data.get("time", 0))
-        db_story = crud.create_story(
+    def _upsert_story(self, story_data: Dict[str, Any], by_user_id: Optional[int],
+                      is_top: bool = False) -> int:
+        """Insert or update a fetched story and return its database ID. The caller commits."""
+        time_value = _from_epoch(story_data.get("time", 0))
+        return crud.upsert_story(
             self.db,
-            hn_id=story_id,
+            hn_id=story_data["id"],
             title=story_data.get("title", ""),
             url=story_data.get("url"),
             score=story_data.get("score"),
@@ -234,73 +338,107 @@ class HackerNewsService:
             type=story_data.get("type"),
             is_top=is_top
         )
-        return db_story.story_id
 
-    async def process_comment(self, comment_id: int, level: int = 0) -> Optional[int]:
-        """Process a comment and store in the database."""
+    async def _fetch_comment_row(self, comment_id: int, level: int = 0) -> Optional[Dict[str, Any]]:
+        """Fetch a comment and build its ``crud.upsert_comments_bulk`` row.
+
+        Returns None if the item is not a valid comment.
+        """
+        comment_data = await self._fetch_comment(comment_id)
+        if not comment_data:
+            return None
+
+        by_user_id = await self.process_user(comment_data.get("by"))
+        return self._comment_row(comment_data, by_user_id, level)
+
+    async def _fetch_comment(self, comment_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch a comment item, or return None if it is not a valid comment."""
         comment_data = await self.get_item(comment_id)
         if not comment_data or comment_data.get("type") != "comment":
             logger.warning(f"P3: Item {comment_id} is not a valid comment")
             return None
+        return comment_data
 
-        by_user_id = await self.process_user(comment_data.get("by"))
+    @staticmethod
+    def _comment_row(comment_data: Dict[str, Any], by_user_id: Optional[int],
+                     level: int = 0) -> Dict[str, Any]:
+        """Build the ``crud.upsert_comments_bulk`` row for a fetched comment."""
+        time_value = _from_epoch(comment_data.get("time", 0))
+        return {
+            "hn_id": comment_data["id"],
+            "text": comment_data.get("text"),
+            "time": time_value,
+            "by_user_id": by_user_id,
+            "parent_id": comment_data.get("parent"),
+            "level": level,
+            "is_top_comment": (level == 0)
+        }
 
-        db_comment = crud.get_comment_by_hn_id(self.db, comment_id)
-        if db_comment:
-            crud.update_comment(
-                self.db,
-                db_comment.comment_id,
-                {
-                    "text": comment_data.get("text"),
-                    "level": level
-                }
-            )
-            return db_comment.comment_id
+    async def process_comment(self, comment_id: int, level: int = 0) -> Optional[int]:
+        """Process a comment and store in the database. The caller commits."""
+        row = await self._fetch_comment_row(comment_id, level)
+        if not row:
+            return None
+        db_comment_id, = crud.upsert_comments_bulk(self.db, [row])
+        return db_comment_id
 
-        time_value = datetime.fromtimestamp(comment_data.get("time", 0))
-        db_comment = crud.create_comment(
-            self.db,
-            hn_id=comment_id,
-            text=comment_data.get("text"),
-            time=time_value,
-            by_user_id=by_user_id,
-            parent_id=comment_data.get("parent"),
-            level=level,
-            is_top_comment=(level == 0)
-        )
-        return db_comment.comment_id
+    async def process_story_comments(self, story_data: Dict[str, Any], db_story_id: int) -> int:
+        """Process comments for a story and store in the database.
 
-    async def process_story_comments(self, story_id: int, db_story_id: int) -> int:
-        """Process comments for a story and store in the database."""
-        story_data = await self.get_item(story_id)
-        if not story_data or not story_data.get("kids"):
+        ``story_data`` is the story item as returned by ``process_story``. Comments
+        and their new authors are fetched concurrently, then stored and linked
+        to the story with one statement each. The caller commits.
+        """
+        ranked_comments = await self._fetch_story_comments(story_data)
+        new_users = await self._fetch_new_users(data.get("by") for _, data in ranked_comments)
+        self._store_new_users(new_users)
+        return self._store_story_comments(db_story_id, ranked_comments)
+
+    async def _fetch_story_comments(self, story_data: Dict[str, Any]) -> List[Tuple[int, Dict[str, Any]]]:
+        """Fetch a story's top comments as ``(rank, comment_data)`` pairs, skipping invalid ones."""
+        comment_ids = (story_data.get("kids") or [])[:settings.TOP_COMMENTS_LIMIT]
+        comments = await _gather(self._fetch_comment(comment_id) for comment_id in comment_ids)
+        return [(rank, data) for rank, data in enumerate(comments) if data]
+
+    def _store_story_comments(self, db_story_id: int,
+                              ranked_comments: List[Tuple[int, Dict[str, Any]]]) -> int:
+        """Upsert a story's fetched top comments and link them to it. The caller commits.
+
+        The comments' authors must already be stored. Returns the number of comments.
+        """
+        if not ranked_comments:
             return 0
 
-        comment_ids = story_data.get("kids", [])[:settings.TOP_COMMENTS_LIMIT]
-        processed_count = 0
+        db_comment_ids = crud.upsert_comments_bulk(
+            self.db,
+            [
+                self._comment_row(data, self._user_ids.get(data.get("by")), level=0)
+                for _, data in ranked_comments
+            ]
+        )
 
-        for rank, comment_id in enumerate(comment_ids):
-            db_comment_id = await self.process_comment(comment_id, level=0)
-            if db_comment_id:
-                crud.link_story_comment(self.db, db_story_id, db_comment_id, rank)
-                processed_count += 1
+        crud.link_story_comments_bulk(
+            self.db,
+            [
+                {"story_id": db_story_id, "comment_id": db_comment_id, "comment_rank": rank}
+                for (rank, _), db_comment_id in zip(ranked_comments, db_comment_ids)
+            ]
+        )
 
-        return processed_count
+        return len(db_comment_ids)
 
     async def refresh_data(self) -> Dict[str, Any]:
-        """Refresh data from the HackerNews API."""
+        """Refresh data from the HackerNews API.
+
+        Everything is fetched from the API first. Only then are the stories,
+        users and comments written, in one short transaction that is committed
+        once, or rolled back if the refresh fails, so SQLite's write lock is
+        never held while waiting on the network.
+        """
         try:
-            data_dir_error = self._check_data_dir_access()
-            if data_dir_error:
-                return self._log_refresh(0, 0, "error", f"DATA_DIR issue: {data_dir_error}")
-                
-            disk_space_error = self._check_disk_space()
-            if disk_space_error:
-                return self._log_refresh(0, 0, "error", f"Disk space issue: {disk_space_error}")
-                
-            db_integrity_error = self._check_database_integrity()
-            if db_integrity_error:
-                return self._log_refresh(0, 0, "error", f"Database issue: {db_integrity_error}")
+            local_error = self._run_local_checks()
+            if local_error:
+                return self._log_refresh(0, 0, "error", local_error)
                 
             api_error = await self._check_api_availability()
             if api_error:
@@ -312,25 +450,34 @@ class HackerNewsService:
             if not top_story_ids:
                 return self._log_refresh(0, 0, "error", "Failed to fetch top stories")
 
-            db_story_ids = []
-            for story_id in top_story_ids:
-                db_story_id = await self.process_story(story_id, is_top=True)
-                if db_story_id:
-                    db_story_ids.append(db_story_id)
+            stories = await _gather(self._fetch_story(story_id) for story_id in top_story_ids)
+            stories = [story_data for story_data in stories if story_data]
+            stories_comments = await _gather(
+                self._fetch_story_comments(story_data) for story_data in stories
+            )
+            new_users = await self._fetch_new_users(
+                [story_data.get("by") for story_data in stories]
+                + [data.get("by") for comments in stories_comments for _, data in comments]
+            )
 
+            self._store_new_users(new_users)
+            db_story_ids = [
+                self._upsert_story(story_data, self._user_ids.get(story_data.get("by")), is_top=True)
+                for story_data in stories
+            ]
             crud.mark_top_stories(self.db, db_story_ids)
-
-            total_comments = 0
-            for i, story_id in enumerate(top_story_ids):
-                if i < len(db_story_ids):
-                    comments_count = await self.process_story_comments(story_id, db_story_ids[i])
-                    total_comments += comments_count
+            total_comments = sum(
+                self._store_story_comments(db_story_id, comments)
+                for db_story_id, comments in zip(db_story_ids, stories_comments)
+            )
+            self.db.commit()
 
             logger.info(f"Successfully refreshed {len(db_story_ids)} stories and {total_comments} comments")
             return self._log_refresh(len(db_story_ids), total_comments, "success")
 
         except Exception as e:
             logger.exception(f"P1: Error refreshing data: {str(e)}")
+            self.db.rollback()
             return self._log_refresh(0, 0, "error", str(e))
 
     def _log_refresh(self, stories_count: int, comments_count: int, 
@@ -357,8 +504,6 @@ class HackerNewsService:
 async def refresh_hackernews_data(db: Session) -> Dict[str, Any]:
     """Refresh HackerNews data in the database."""
     service = HackerNewsService(db)
-    try:
-        result = await service.refresh_data()
-        return result
-    finally:
-        await service.close()
+    result = await service.refresh_data()
+    invalidate_responses()
+    return result
@@ -0,0 +1,85 @@
+"""Database maintenance checks that are too expensive to run on every refresh.
+
+These are meant to be run periodically, e.g. daily via ``scripts/run_maintenance.py``.
+"""
+import logging
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.utils.backup import get_db_path
+
+logger = logging.getLogger(__name__)
+
+
+def check_database_integrity(db_path: Path) -> Optional[str]:
+    """Run a full ``PRAGMA integrity_check`` on the database.
+
+    The check reads every page of the database file, so its cost grows with the
+    size of the database.
+
+    Returns:
+        Error message if there's an issue, None otherwise.
+    """
+    try:
+        if not db_path.exists():
+            error_msg = f"Database file at {db_path} does not exist"
+            logger.error(f"P0: {error_msg}")
+            return error_msg
+            
+        conn = sqlite3.connect(str(db_path))
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()
+        finally:
+            conn.close()
+        
+        if not result or result[0] != "ok":
+            error_msg = f"Database corruption detected in {db_path}: {result[0] if result else 'unknown error'}"
+            logger.error(f"P0: {error_msg}")
+            return error_msg
+            
+        return None
+    except sqlite3.Error as e:
+        error_msg = f"Database access error: {str(e)}"
+        logger.error(f"P0: {error_msg}")
+        return error_msg
+
+
+def check_disk_space(data_dir: Path, min_free_percent: float = 10) -> Optional[str]:
+    """Check if there's sufficient disk space available.
+    
+    Args:
+        data_dir: Directory whose file system is checked.
+        min_free_percent: Minimum free disk space percentage required.
+        
+    Returns:
+        Error message if disk space is low, None otherwise.
+    """
+    try:
+        total, used, free = shutil.disk_usage(data_dir)
+        free_percent = (free / total) * 100
+        
+        if free_percent < min_free_percent:
+            error_msg = f"Disk space critically low: {free_percent:.1f}% free, {free / (1024*1024*1024):.2f} GB"
+            logger.error(f"P1: {error_msg}")
+            return error_msg
+            
+        return None
+    except OSError as e:
+        error_msg = f"Error checking disk space: {str(e)}"
+        logger.error(f"P1: {error_msg}")
+        return error_msg
+
+
+def run_maintenance_checks() -> Dict[str, Optional[str]]:
+    """Run all maintenance checks against the configured database.
+    
+    Returns:
+        Mapping of check name to its error message, or None if it passed.
+    """
+    db_path = get_db_path()
+    return {
+        "disk_space": check_disk_space(db_path.parent),
+        "integrity": check_database_integrity(db_path),
+    }
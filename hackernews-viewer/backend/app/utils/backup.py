@@ -1,42 +1,56 @@
 """Utility functions for database backup and restore operations."""
-import logging
+import contextlib
+import functools
+import heapq
 import os
-import shutil
+import re
 import sqlite3
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 
 from app.core.config import settings
+from app.utils.logging import get_logger
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler()
-    ]
+logger = get_logger(__name__, "backup.log")
+
+
+# Group 1 is the whole timestamp, groups 2-7 its year..second fields.
+_BACKUP_NAME_RE = re.compile(
+    r"^hackernews_((\d{4})(\d{2})(\d{2})(\d{2})(\d{2})(\d{2}))\.db$"
 )
-logger = logging.getLogger(__name__)
 
-logs_dir = Path(settings.DATA_DIR) / "logs"
-logs_dir.mkdir(parents=True, exist_ok=True)
+# Last list_backups result, keyed on the backup directory's mtime, which
+# changes whenever a backup is added or removed.
+_list_cache: Optional[Tuple[int, List[Dict[str, Any]]]] = None
+
+# Validation opens the backup read-only and immutable, so SQLite skips all
+# locking and journal handling; only cache-related PRAGMAs apply.
+_VALIDATE_PRAGMAS = """
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+"""
 
-file_handler = logging.FileHandler(logs_dir / "backup.log")
-logger.addHandler(file_handler)
+
+@functools.lru_cache(maxsize=1)
+def _backup_dir_path() -> Path:
+    """Get the path to the backup directory, cached as the settings do not change."""
+    return Path(settings.BACKUP_DIR)
 
 
 def ensure_backup_dir() -> Path:
-    """Ensure the backup directory exists and return its path."""
-    backup_dir = Path(settings.BACKUP_DIR)
+    """Ensure the backup directory exists and return its path.
+    
+    The directory is checked on every call, so it is recreated if it was removed.
+    """
+    backup_dir = _backup_dir_path()
     backup_dir.mkdir(parents=True, exist_ok=True)
     return backup_dir
 
 
-def get_db_path() -> Path:
-    """Get the path to the database file."""
-    data_dir = Path(settings.DATA_DIR)
-    data_dir.mkdir(parents=True, exist_ok=True)
-    
+@functools.lru_cache(maxsize=1)
+def _db_file_path() -> Path:
+    """Parse the database file's path from the database URL, cached as the settings do not change."""
     db_url = settings.DATABASE_URL
     if not db_url.startswith("sqlite:///"):
         logger.error(f"Unsupported database URL: {db_url}")
@@ -45,6 +59,24 @@ def get_db_path() -> Path:
     return Path(db_url.replace("sqlite:///", ""))
 
 
+def get_db_path() -> Path:
+    """Get the path to the database file.
+    
+    The data directory is checked on every call, so it is recreated if it was removed.
+    """
+    Path(settings.DATA_DIR).mkdir(parents=True, exist_ok=True)
+    return _db_file_path()
+
+
+def _iter_backup_entries(backup_dir: Path) -> Iterator[os.DirEntry]:
+    """Yield the directory entries in ``backup_dir`` named like backup files."""
+    with os.scandir(backup_dir) as it:
+        for entry in it:
+            name = entry.name
+            if name.startswith("hackernews_") and name.endswith(".db"):
+                yield entry
+
+
 def cleanup_old_backups(keep: int = 10) -> None:
     """Clean up old backups, keeping only the most recent ones.
     
@@ -53,22 +85,69 @@ def cleanup_old_backups(keep: int = 10) -> None:
     """
     try:
         backup_dir = ensure_backup_dir()
-        backup_files = list(backup_dir.glob("hackernews_*.db"))
-        
-        backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+        entries = list(_iter_backup_entries(backup_dir))
+        keepers = {
+            e.path for e in heapq.nlargest(keep, entries, key=lambda e: e.stat().st_mtime)
+        }
         
-        for old_file in backup_files[keep:]:
-            old_file.unlink()
-            logger.info(f"Removed old backup: {old_file}")
+        for old_entry in entries:
+            if old_entry.path in keepers:
+                continue
+            os.unlink(old_entry.path)
+            logger.info(f"Removed old backup: {old_entry.path}")
     except Exception as e:
         logger.exception(f"Error cleaning up old backups: {e}")
 
 
+def _copy_database(src_path: Path, dst_path: Path, pages: int = 1024,
+                   durable: bool = True) -> None:
+    """Copy a database with SQLite's online backup API.
+    
+    Pages are copied in batches of ``pages`` through SQLite itself, so the copy
+    is consistent even while the application is writing to the database. A
+    ``pages`` value of -1 copies everything in a single step.
+    
+    A new copy is switched out of WAL mode so that it is a single self-contained
+    file; a destination that is already in WAL mode (the live database during a
+    restore) keeps its journal mode. With ``durable=False`` the destination is
+    written without any fsync, for copies that are not worth a durable barrier.
+    """
+    is_new = not dst_path.exists()
+    with contextlib.closing(sqlite3.connect(str(src_path))) as src:
+        with contextlib.closing(sqlite3.connect(str(dst_path))) as dst:
+            if not durable:
+                dst.execute("PRAGMA synchronous=OFF")
+            src.backup(dst, pages=pages)
+            if is_new:
+                dst.execute("PRAGMA journal_mode=DELETE")
+
+
+def _vacuum_into(src_path: Path, dst_path: Path) -> int:
+    """Write a compacted copy of a database with ``VACUUM INTO``.
+    
+    Free pages are left out, so the copy is usually smaller than the source. It
+    reads a consistent snapshot and is written in rollback-journal mode.
+    
+    Returns:
+        The size of the source database in bytes, including pages that are
+        still only in its write-ahead log.
+    """
+    with contextlib.closing(sqlite3.connect(str(src_path))) as src:
+        page_count = src.execute("PRAGMA page_count").fetchone()[0]
+        page_size = src.execute("PRAGMA page_size").fetchone()[0]
+        src.execute("VACUUM INTO ?", (str(dst_path),))
+    return page_count * page_size
+
+
 def create_backup() -> Dict[str, Any]:
     """Create a backup of the current database.
     
+    With ``settings.BACKUP_COMPACT`` the backup is a compacted copy written by
+    ``VACUUM INTO``; otherwise it is a page-for-page copy.
+    
     Returns:
-        Dict with backup metadata including filename, timestamp, and size.
+        Dict with backup metadata including filename, timestamp, and the sizes
+        of the backup and of the source database.
         
     Raises:
         FileNotFoundError: If the database file doesn't exist.
@@ -81,55 +160,91 @@ def create_backup() -> Dict[str, Any]:
             raise FileNotFoundError(f"Database file not found at {db_path}")
         
         backup_dir = ensure_backup_dir()
-        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        now = datetime.utcnow()
+        timestamp = now.strftime("%Y%m%d%H%M%S")
         backup_filename = f"hackernews_{timestamp}.db"
         backup_path = backup_dir / backup_filename
+        # Written under a name outside the backup naming scheme and renamed once
+        # complete, so a failed backup is never listed as one. VACUUM INTO also
+        # refuses to overwrite, and a backup taken within the same second should
+        # replace the earlier one.
+        temp_path = backup_dir / f".{backup_filename}.tmp"
+        temp_path.unlink(missing_ok=True)
         
-        shutil.copy2(db_path, backup_path)
+        try:
+            if settings.BACKUP_COMPACT:
+                source_size = _vacuum_into(db_path, temp_path)
+                file_size = temp_path.stat().st_size
+            else:
+                _copy_database(db_path, temp_path)
+                # A page-for-page copy is exactly as large as the source database.
+                file_size = source_size = temp_path.stat().st_size
+            os.replace(temp_path, backup_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
         logger.info(f"Database backup created: {backup_path}")
         
-        file_size = backup_path.stat().st_size
-        
         cleanup_old_backups()
         
         return {
             "filename": backup_filename,
             "path": str(backup_path),
             "timestamp": timestamp,
-            "created_at": datetime.utcnow().isoformat(),
-            "size_bytes": file_size
+            "created_at": now.isoformat(),
+            "size_bytes": file_size,
+            "source_size_bytes": source_size
         }
     except Exception as e:
         logger.exception(f"Error backing up database: {e}")
         raise
 
 
+def _backup_info(match: "re.Match[str]", path: str, size_bytes: int) -> Dict[str, Any]:
+    """Build the metadata dictionary for a backup file name matched by ``_BACKUP_NAME_RE``.
+    
+    Raises:
+        ValueError: If the timestamp fields do not form a valid date and time.
+    """
+    created_at = datetime(*map(int, match.groups()[1:]))
+    return {
+        "filename": match.string,
+        "path": path,
+        "timestamp": match.group(1),
+        "created_at": created_at.isoformat(),
+        "size_bytes": size_bytes
+    }
+
+
 def list_backups() -> List[Dict[str, Any]]:
     """List all available database backups.
     
     Returns:
         List of dictionaries with backup metadata.
     """
+    global _list_cache
     backup_dir = ensure_backup_dir()
-    backups = []
+    dir_mtime = backup_dir.stat().st_mtime_ns
+    if _list_cache is not None and _list_cache[0] == dir_mtime:
+        return [dict(info) for info in _list_cache[1]]
+    
+    dated = []
     
-    for backup_file in backup_dir.glob("hackernews_*.db"):
+    for entry in _iter_backup_entries(backup_dir):
+        match = _BACKUP_NAME_RE.match(entry.name)
+        if not match:
+            continue
         try:
-            timestamp = backup_file.name.replace("hackernews_", "").replace(".db", "")
-            created_at = datetime.strptime(timestamp, "%Y%m%d%H%M%S")
-            
-            backups.append({
-                "filename": backup_file.name,
-                "path": str(backup_file),
-                "timestamp": timestamp,
-                "created_at": created_at.isoformat(),
-                "size_bytes": backup_file.stat().st_size
-            })
+            dated.append((match.group(1), _backup_info(match, entry.path, entry.stat().st_size)))
         except (ValueError, OSError) as e:
-            logger.warning(f"Skipping invalid backup file: {backup_file} - {str(e)}")
-            continue
+            logger.warning(f"Skipping invalid backup file: {entry.path} - {str(e)}")
     
-    return sorted(backups, key=lambda x: x["timestamp"], reverse=True)
+    # The timestamps sort lexicographically in chronological order.
+    dated.sort(key=lambda item: item[0], reverse=True)
+    backups = [info for _, info in dated]
+    _list_cache = (dir_mtime, backups)
+    # Callers get copies, so changing a returned entry can't alter the cache.
+    return [dict(info) for info in backups]
 
 
 def get_backup_by_filename(filename: str) -> Optional[Dict[str, Any]]:
@@ -141,36 +256,47 @@ def get_backup_by_filename(filename: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dictionary with backup metadata or None if not found.
     """
-    backups = list_backups()
-    for backup in backups:
-        if backup["filename"] == filename:
-            return backup
-    return None
+    match = _BACKUP_NAME_RE.match(filename)
+    if not match:
+        return None
+    
+    backup_path = ensure_backup_dir() / filename
+    try:
+        size_bytes = backup_path.stat().st_size
+        return _backup_info(match, str(backup_path), size_bytes)
+    except (ValueError, OSError):
+        return None
 
 
-def validate_backup(backup_path: Path) -> bool:
+def validate_backup(backup_path: Path, size: Optional[int] = None) -> bool:
     """Validate that a backup file is a valid SQLite database.
     
     Args:
         backup_path: Path to the backup file.
+        size: The file size in bytes, if already known, to skip statting the file.
         
     Returns:
         True if valid, False otherwise.
     """
-    if not backup_path.exists() or backup_path.stat().st_size == 0:
+    if size is None:
+        try:
+            size = backup_path.stat().st_size
+        except OSError:
+            size = 0
+    if size == 0:
         logger.error(f"Backup file does not exist or is empty: {backup_path}")
         return False
     
     try:
-        conn = sqlite3.connect(str(backup_path))
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA integrity_check")
-        result = cursor.fetchone()
-        conn.close()
+        # Backups are never modified once written, which is what immutable=1 asserts.
+        uri = f"{backup_path.resolve().as_uri()}?mode=ro&immutable=1"
+        with contextlib.closing(sqlite3.connect(uri, uri=True)) as conn:
+            conn.executescript(_VALIDATE_PRAGMAS)
+            result = conn.execute("PRAGMA quick_check").fetchone()
         
         is_valid = result and result[0] == "ok"
         if not is_valid:
-            logger.error(f"Backup file failed integrity check: {backup_path}")
+            logger.error(f"Backup file failed quick check: {backup_path}")
         return is_valid
     except sqlite3.Error as e:
         logger.error(f"Error validating backup file: {backup_path} - {str(e)}")
@@ -199,27 +325,32 @@ def restore_from_backup(filename: str) -> Dict[str, Any]:
             raise FileNotFoundError(f"Backup file not found: {filename}")
         
         backup_path = Path(backup["path"])
-        if not validate_backup(backup_path):
+        if not validate_backup(backup_path, size=backup["size_bytes"]):
             logger.error(f"Invalid backup file: {filename}")
             raise ValueError(f"Invalid backup file: {filename}")
         
         db_path = get_db_path()
+        now = datetime.utcnow()
         
         temp_backup = None
         if db_path.exists():
-            timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+            timestamp = now.strftime("%Y%m%d%H%M%S")
             temp_backup_path = ensure_backup_dir() / f"pre_restore_{timestamp}.db"
-            shutil.copy2(db_path, temp_backup_path)
+            # Only a safety net for this restore; the restore itself is durable.
+            _copy_database(db_path, temp_backup_path, durable=False)
             temp_backup = str(temp_backup_path)
             logger.info(f"Created safety backup before restore: {temp_backup_path}")
         
-        shutil.copy2(backup_path, db_path)
+        # Restored through SQLite rather than by overwriting the file, so open
+        # connections and the live database's WAL stay consistent. A single step
+        # replaces the whole database in one transaction.
+        _copy_database(backup_path, db_path, pages=-1)
         logger.info(f"Database successfully restored from: {filename}")
         
         return {
             "success": True,
             "restored_from": filename,
-            "restored_at": datetime.utcnow().isoformat(),
+            "restored_at": now.isoformat(),
             "temp_backup": temp_backup
         }
     except Exception as e:
@@ -0,0 +1,59 @@
+"""In-process caching of serialized API responses."""
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+
+_data_version = 0
+
+
+def invalidate_responses() -> None:
+    """Invalidate every cached response, e.g. after the data has been refreshed."""
+    global _data_version
+    _data_version += 1
+
+
+class ResponseCache:
+    """Cache of serialized response bodies with a short time-to-live.
+
+    Entries expire after ``ttl`` seconds or as soon as ``invalidate_responses``
+    is called, whichever comes first. Take ``version()`` before reading the
+    data and pass it to ``set``, so a body built from data read before an
+    invalidation is never stored as current.
+    """
+
+    def __init__(self, ttl: float):
+        """Initialize an empty cache whose entries live for ``ttl`` seconds."""
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, int, bytes]] = {}
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Get the cached body for a key, or None if missing or stale."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, version, body = entry
+        if version != _data_version or time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return None
+        return body
+
+    @staticmethod
+    def version() -> int:
+        """Get the current data version, to pass to ``set``."""
+        return _data_version
+
+    def set(self, key: Hashable, body: bytes, version: int) -> None:
+        """Store a serialized body for a key.
+
+        The body is dropped if responses were invalidated since ``version`` was
+        taken, as the data it was built from may predate a refresh.
+        """
+        if version != _data_version:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, version, body)
+
+
+top_stories_cache = ResponseCache(ttl=settings.TOP_STORIES_CACHE_TTL)
+system_status_cache = ResponseCache(ttl=settings.SYSTEM_STATUS_CACHE_TTL)
@@ -1,7 +1,9 @@
 """Utility functions for logging."""
+import atexit
 import logging
+import queue
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from app.core.config import settings
 
@@ -12,6 +14,9 @@ logs_dir.mkdir(parents=True, exist_ok=True)
 def get_logger(name: str, log_file: str = None):
     """Get a configured logger instance.
     
+    Records are put on a queue and written to the console and log file by a
+    background listener thread, so logging calls never block on I/O.
+    
     Args:
         name: The name of the logger
         log_file: The name of the log file (without path)
@@ -25,12 +30,14 @@ def get_logger(name: str, log_file: str = None):
         return logger
         
     logger.setLevel(logging.INFO)
+    # The handlers below already cover the console; don't log through root too.
+    logger.propagate = False
     
     log_format = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(log_format)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     if log_file:
         file_path = logs_dir / log_file
@@ -41,6 +48,13 @@ def get_logger(name: str, log_file: str = None):
             encoding="utf-8"
         )
         file_handler.setFormatter(log_format)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    log_queue: queue.Queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
     
     return logger
@@ -1,17 +1,13 @@
+#!/usr/bin/env -S python3 -OO
 """Script to refresh HackerNews data for cron job."""
 import asyncio
 import logging
-import os
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from sqlalchemy.orm import Session
-
 from app.core.config import settings
-from app.core.database import get_db, engine
-from app.services.hackernews import refresh_hackernews_data
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +22,12 @@ logger = logging.getLogger(__name__)
 
 async def main():
     """Main function to refresh data."""
+    # Imported here so the database and service stack only load for an actual run.
+    from sqlmodel import Session
+
+    from app.core.database import engine
+    from app.services.hackernews import close_http_client, refresh_hackernews_data
+
     logger.info("Starting data refresh")
     
     logs_dir = Path(settings.DATA_DIR) / "logs"
@@ -37,6 +39,8 @@ async def main():
             logger.info(f"Data refresh completed: {result}")
         except Exception as e:
             logger.exception("Error refreshing data")
+        finally:
+            await close_http_client()
 
 
 if __name__ == "__main__":
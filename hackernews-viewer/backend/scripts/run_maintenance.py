@@ -0,0 +1,33 @@
+"""Script to run periodic maintenance checks on the HackerNews SQLite database.
+
+This script runs the full integrity and disk space checks from
+app.services.maintenance, which are too expensive for every data refresh.
+"""
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.maintenance import run_maintenance_checks
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main function to run the maintenance checks."""
+    logger.info("Starting database maintenance checks")
+    results = run_maintenance_checks()
+    failed = {name: error for name, error in results.items() if error}
+    if failed:
+        logger.error(f"Maintenance checks failed: {failed}")
+        return False
+    logger.info("All maintenance checks passed")
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
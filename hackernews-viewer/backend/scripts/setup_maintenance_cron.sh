@@ -0,0 +1,26 @@
+
+SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )"
+MAINTENANCE_SCRIPT="$SCRIPT_DIR/run_maintenance.py"
+
+chmod +x "$MAINTENANCE_SCRIPT"
+
+TEMP_CRONTAB=$(mktemp)
+
+crontab -l > "$TEMP_CRONTAB" 2>/dev/null || echo "# HackerNews Viewer cron jobs" > "$TEMP_CRONTAB"
+
+if ! grep -q "$MAINTENANCE_SCRIPT" "$TEMP_CRONTAB"; then
+    echo "# HackerNews Viewer - Daily database maintenance checks" >> "$TEMP_CRONTAB"
+    echo "0 3 * * * cd $SCRIPT_DIR/.. && $MAINTENANCE_SCRIPT >> $SCRIPT_DIR/../logs/maintenance_cron.log 2>&1" >> "$TEMP_CRONTAB"
+    
+    crontab "$TEMP_CRONTAB"
+    echo "Maintenance cron job added successfully."
+else
+    echo "Maintenance cron job already exists."
+fi
+
+rm "$TEMP_CRONTAB"
+
+mkdir -p "$SCRIPT_DIR/../logs"
+
+echo "Maintenance cron job setup complete."
+echo "The database will be checked daily at 03:00."
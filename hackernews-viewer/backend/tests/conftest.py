@@ -3,12 +3,13 @@ import os
 import sys
 import pytest
 import asyncio
+from sqlalchemy import event
 from sqlmodel import SQLModel, Session, create_engine
 from sqlalchemy.pool import StaticPool
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.core.database import get_db
+from app.core.database import SQLITE_PRAGMAS, get_db
 
 
 @pytest.fixture(scope="session")
@@ -28,24 +29,42 @@ def test_db():
         poolclass=StaticPool,
     )
     
-    SQLModel.metadata.create_all(engine)
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Apply the application's SQLite PRAGMAs to the test connection."""
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+        # Let SQLAlchemy emit BEGIN itself so that SAVEPOINTs work with pysqlite.
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        """Start the transaction that pysqlite no longer starts implicitly."""
+        conn.exec_driver_sql("BEGIN")
     
-    def get_session():
-        with Session(engine) as session:
-            yield session
+    SQLModel.metadata.create_all(engine)
     
-    return get_session
+    return engine
 
 
 @pytest.fixture
 def db_session(test_db):
-    """Get a database session for testing."""
-    session = next(test_db())
+    """Get a database session whose changes are rolled back after the test.
+    
+    The session runs inside an outer transaction and turns its own commits into
+    SAVEPOINT releases, so nothing a test writes outlives it.
+    """
+    connection = test_db.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
-        session.rollback()
         session.close()
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture
@@ -7,12 +7,14 @@ from sqlmodel import Session
 
 from app.main import app
 from app.core.database import get_db
+from app.utils.cache import invalidate_responses
 
 
 @pytest.fixture
 def client(override_get_db):
     """Test client with overridden database dependency."""
     app.dependency_overrides[get_db] = override_get_db
+    invalidate_responses()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides = {}
@@ -32,20 +34,10 @@ def test_health_endpoint(client):
     assert response.json() == {"status": "ok"}
 
 
-@patch("app.api.endpoints.stories.crud.get_top_stories")
+@patch("app.api.endpoints.stories.crud.get_top_stories_rows")
 def test_get_top_stories(mock_get_top_stories, client, db_session):
     """Test the get_top_stories endpoint."""
-    mock_story = MagicMock()
-    mock_story.story_id = 1
-    mock_story.hn_id = 12345
-    mock_story.title = "Test Story"
-    mock_story.url = "https://example.com"
-    mock_story.score = 100
-    mock_story.time = None
-    mock_story.user = None
-    mock_story.descendants = 10
-    mock_story.text = None
-    mock_story.type = "story"
+    mock_story = (1, 12345, "Test Story", "https://example.com", 100, None, None, 10, None, "story")
     
     mock_get_top_stories.return_value = [mock_story]
     
@@ -58,6 +50,38 @@ def test_get_top_stories(mock_get_top_stories, client, db_session):
     assert response.json()[0]["score"] == 100
 
 
+@patch("app.api.endpoints.stories.crud.get_top_stories_rows")
+def test_get_top_stories_cached(mock_get_top_stories, client, db_session):
+    """Test that repeated get_top_stories calls are served from the cache."""
+    mock_get_top_stories.return_value = []
+    
+    first = client.get("/api/stories/top")
+    second = client.get("/api/stories/top")
+    
+    assert first.status_code == 200
+    assert second.content == first.content
+    mock_get_top_stories.assert_called_once()
+    
+    invalidate_responses()
+    client.get("/api/stories/top")
+    assert mock_get_top_stories.call_count == 2
+
+
+@patch("app.api.endpoints.stories.crud.get_top_stories_rows")
+def test_get_top_stories_not_cached_across_refresh(mock_get_top_stories, client, db_session):
+    """Test that a response read before an invalidation is not cached as current."""
+    def rows_read_during_refresh(db, limit):
+        invalidate_responses()  # The refresh commits while the rows are being read.
+        return []
+    
+    mock_get_top_stories.side_effect = rows_read_during_refresh
+    
+    client.get("/api/stories/top")
+    client.get("/api/stories/top")
+    
+    assert mock_get_top_stories.call_count == 2
+
+
 @patch("app.api.endpoints.stories.crud.get_story")
 def test_get_story(mock_get_story, client, db_session):
     """Test the get_story endpoint."""
@@ -95,23 +119,16 @@ def test_get_story_not_found(mock_get_story, client, db_session):
 
 
 @patch("app.api.endpoints.stories.crud.get_story")
-@patch("app.api.endpoints.stories.crud.get_top_comments_for_story")
+@patch("app.api.endpoints.stories.crud.stream_top_comments_for_story_rows")
 def test_get_story_comments(mock_get_top_comments, mock_get_story, client, db_session):
     """Test the get_story_comments endpoint."""
     mock_story = MagicMock()
     mock_story.story_id = 1
     mock_get_story.return_value = mock_story
     
-    mock_comment = MagicMock()
-    mock_comment.comment_id = 1
-    mock_comment.hn_id = 67890
-    mock_comment.text = "Test Comment"
-    mock_comment.time = None
-    mock_comment.user = None
-    mock_comment.level = 0
-    mock_comment.parent_id = None
+    mock_comment = (1, 67890, "Test Comment", None, None, 0, None)
     
-    mock_get_top_comments.return_value = [mock_comment]
+    mock_get_top_comments.return_value = iter([[mock_comment]])
     
     response = client.get("/api/stories/1/comments")
     
@@ -0,0 +1,139 @@
+"""Tests for database backup and restore."""
+import os
+import sqlite3
+from datetime import datetime
+import pytest
+
+from app.core.config import settings
+from app.utils import backup
+
+
+@pytest.fixture
+def live_db(tmp_path, monkeypatch):
+    """Point the backup utilities at a WAL-mode database in a temporary DATA_DIR."""
+    db_path = tmp_path / "hackernews.db"
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{db_path}")
+    monkeypatch.setattr(settings, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(backup, "_list_cache", None)
+    backup._db_file_path.cache_clear()
+    backup._backup_dir_path.cache_clear()
+    
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE story (id INTEGER PRIMARY KEY, title TEXT)")
+    conn.executemany("INSERT INTO story (title) VALUES (?)", [("first",), ("second",)])
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        conn.close()
+        backup._db_file_path.cache_clear()
+        backup._backup_dir_path.cache_clear()
+
+
+def test_backup_restore_round_trip(live_db):
+    """Test that a restored backup brings back its rows and keeps the database in WAL mode."""
+    created = backup.create_backup()
+    
+    assert [b["filename"] for b in backup.list_backups()] == [created["filename"]]
+    assert created["source_size_bytes"] > 0
+    
+    live_db.execute("DELETE FROM story")
+    live_db.execute("INSERT INTO story (title) VALUES ('after backup')")
+    live_db.commit()
+    
+    result = backup.restore_from_backup(created["filename"])
+    
+    assert result["success"] is True
+    assert result["temp_backup"] is not None
+    rows = live_db.execute("SELECT title FROM story ORDER BY id").fetchall()
+    assert rows == [("first",), ("second",)]
+    assert live_db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.parametrize("filename", [
+    "../hackernews_20240101000000.db",
+    "../x",
+    "hackernews_latest.db",
+    "hackernews_20241301000000.db",
+])
+def test_get_backup_by_filename_rejects_invalid_names(live_db, filename):
+    """Test that names outside the backup naming scheme are not resolved."""
+    assert backup.get_backup_by_filename(filename) is None
+
+
+def test_list_backups_cache(live_db):
+    """Test that cached listings are copies and are refreshed after a new backup."""
+    first = backup.create_backup()
+    
+    listed = backup.list_backups()
+    listed[0]["size_bytes"] = -1
+    assert backup.list_backups()[0]["size_bytes"] == first["size_bytes"]
+    
+    # Backup names have one-second resolution; give the next one a distinct name.
+    dated_name = "hackernews_20000101000000.db"
+    os.rename(first["path"], os.path.join(settings.BACKUP_DIR, dated_name))
+    assert [b["filename"] for b in backup.list_backups()] == [dated_name]
+    second = backup.create_backup()
+    
+    assert [b["filename"] for b in backup.list_backups()] == [second["filename"], dated_name]
+
+
+def test_create_backup_recreates_backup_dir(live_db):
+    """Test that a backup directory removed at runtime is created again."""
+    backup.create_backup()
+    for name in os.listdir(settings.BACKUP_DIR):
+        os.unlink(os.path.join(settings.BACKUP_DIR, name))
+    os.rmdir(settings.BACKUP_DIR)
+    
+    assert os.path.exists(backup.create_backup()["path"])
+
+
+def test_get_db_path_recreates_data_dir(live_db, tmp_path, monkeypatch):
+    """Test that a data directory removed at runtime is created again."""
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(settings, "DATA_DIR", str(data_dir))
+    
+    backup.get_db_path()
+    data_dir.rmdir()
+    backup.get_db_path()
+    
+    assert data_dir.is_dir()
+
+
+@pytest.mark.parametrize("compact", [True, False])
+def test_create_backup_same_second(live_db, monkeypatch, compact):
+    """Test that a second backup within the same second replaces the first."""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return cls(2024, 1, 2, 3, 4, 5)
+    
+    monkeypatch.setattr(backup, "datetime", FrozenDatetime)
+    monkeypatch.setattr(settings, "BACKUP_COMPACT", compact)
+    
+    first = backup.create_backup()
+    live_db.execute("INSERT INTO story (title) VALUES ('third')")
+    live_db.commit()
+    second = backup.create_backup()
+    
+    assert second["filename"] == first["filename"] == "hackernews_20240102030405.db"
+    assert os.listdir(settings.BACKUP_DIR) == [second["filename"]]
+    with sqlite3.connect(second["path"]) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM story").fetchone()[0] == 3
+
+
+def test_create_backup_failure_leaves_no_file(live_db, monkeypatch):
+    """Test that a failed backup leaves nothing that could be listed as a backup."""
+    def failing_vacuum_into(src_path, dst_path):
+        dst_path.write_bytes(b"partial")
+        raise sqlite3.OperationalError("disk I/O error")
+    
+    monkeypatch.setattr(backup, "_vacuum_into", failing_vacuum_into)
+    
+    with pytest.raises(sqlite3.OperationalError):
+        backup.create_backup()
+    
+    assert os.listdir(settings.BACKUP_DIR) == []
+    assert backup.list_backups() == []
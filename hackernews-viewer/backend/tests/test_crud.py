@@ -1,8 +1,12 @@
 """Tests for CRUD operations."""
+import zlib
 import pytest
 from datetime import datetime
-from sqlmodel import Session, select
+from sqlalchemy import inspect, text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine, select
 
+from app.core.database import init_db
 from app.db.models import DimUser, DimStory, DimComment, FactStoryComment, FactRefreshLog
 from app.db import crud
 
@@ -22,7 +26,7 @@ def test_user():
 def test_story(request):
     """Create a test story for testing."""
     test_name = request.node.name if hasattr(request, "node") else "default"
-    hn_id = int(hash(test_name) % 100000) + 10000  # Ensure positive and reasonable size
+    hn_id = zlib.crc32(test_name.encode()) % 100000 + 10000  # Stable across runs, unlike hash()
     
     return {
         "hn_id": hn_id,
@@ -88,11 +92,30 @@ def test_get_top_stories(db_session, test_story):
     assert len(top_stories) > 0
     assert any(s.story_id == story.story_id for s in top_stories)
     
+    top_story_rows = crud.get_top_stories_rows(db_session)
+    assert [row[0] for row in top_story_rows] == [s.story_id for s in top_stories]
+    
     if len(top_stories) > 1:
         for i in range(1, len(top_stories)):
             assert top_stories[i-1].score >= top_stories[i].score
 
 
+def test_upsert_story(db_session, test_story):
+    """Test that upserting a story inserts it once and then updates it in place."""
+    story_id = crud.upsert_story(db_session, **test_story)
+    story = crud.get_story_by_hn_id(db_session, test_story["hn_id"])
+    assert story.story_id == story_id
+    assert story.score == test_story["score"]
+    
+    updated = {**test_story, "score": test_story["score"] + 50, "title": "Updated Title"}
+    assert crud.upsert_story(db_session, **updated) == story_id
+    
+    db_session.expire_all()
+    story = crud.get_story(db_session, story_id)
+    assert story.score == updated["score"]
+    assert story.title == "Updated Title"
+
+
 def test_mark_top_stories(db_session, test_story):
     """Test marking stories as top stories."""
     story1 = crud.create_story(db_session, **test_story)
@@ -132,6 +155,54 @@ def test_create_and_get_comment(db_session, test_comment, test_story):
     top_comments = crud.get_top_comments_for_story(db_session, story.story_id)
     assert len(top_comments) > 0
     assert any(c.comment_id == comment.comment_id for c in top_comments)
+    
+    top_comment_rows = crud.get_top_comments_for_story_rows(db_session, story.story_id)
+    assert any(row[0] == comment.comment_id for row in top_comment_rows)
+
+
+def test_upsert_comments_bulk(db_session):
+    """Test creating and then updating several comments in one batch."""
+    rows = [
+        {"hn_id": 70001, "text": "First", "time": datetime.utcnow(), "level": 0, "is_top_comment": True},
+        {"hn_id": 70002, "text": "Second", "time": datetime.utcnow(), "level": 0, "is_top_comment": True},
+    ]
+    
+    comment_ids = crud.upsert_comments_bulk(db_session, rows)
+    assert len(comment_ids) == 2
+    
+    for comment_id, row in zip(comment_ids, rows):
+        comment = crud.get_comment(db_session, comment_id)
+        assert comment is not None
+        assert comment.hn_id == row["hn_id"]
+        assert comment.text == row["text"]
+    
+    updated_rows = [{**row, "text": row["text"] + " (edited)", "level": 1} for row in reversed(rows)]
+    assert crud.upsert_comments_bulk(db_session, updated_rows) == comment_ids[::-1]
+    
+    db_session.expire_all()
+    comment = crud.get_comment(db_session, comment_ids[0])
+    assert comment.text == "First (edited)"
+    assert comment.level == 1
+    
+    assert crud.upsert_comments_bulk(db_session, []) == []
+
+
+def test_link_story_comments_bulk(db_session, test_story):
+    """Test linking several comments to a story in one batch."""
+    story = crud.create_story(db_session, **test_story)
+    comment_ids = crud.upsert_comments_bulk(db_session, [
+        {"hn_id": 70101, "text": "First"},
+        {"hn_id": 70102, "text": "Second"},
+    ])
+    
+    crud.link_story_comments_bulk(db_session, [
+        {"story_id": story.story_id, "comment_id": comment_id, "comment_rank": rank}
+        for rank, comment_id in enumerate(comment_ids)
+    ])
+    db_session.commit()
+    
+    top_comments = crud.get_top_comments_for_story(db_session, story.story_id)
+    assert [c.comment_id for c in top_comments] == comment_ids
 
 
 def test_log_and_get_refresh(db_session):
@@ -146,3 +217,21 @@ def test_log_and_get_refresh(db_session):
     assert last_refresh.refresh_id == refresh_log.refresh_id
     assert last_refresh.stories_refreshed == 5
     assert last_refresh.comments_refreshed == 50
+
+
+def test_init_db_adds_indexes_to_existing_tables():
+    """Test that indexes are created on tables that existed before they were declared."""
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE dim_stories (story_id INTEGER PRIMARY KEY, hn_id INTEGER, "
+            "title VARCHAR, score INTEGER, is_top BOOLEAN)"
+        ))
+    
+    init_db(engine)
+    init_db(engine)
+    
+    inspector = inspect(engine)
+    assert "ix_stories_top_score" in {ix["name"] for ix in inspector.get_indexes("dim_stories")}
+    assert "ix_fsc_story_rank" in {ix["name"] for ix in inspector.get_indexes("fact_story_comments")}
+    assert "ix_refresh_time_desc" in {ix["name"] for ix in inspector.get_indexes("fact_refresh_log")}
@@ -1,10 +1,19 @@
 """Tests for the HackerNews service."""
 import pytest
 import asyncio
+import sqlite3
+import httpx
 from unittest.mock import patch, MagicMock, AsyncMock
 from datetime import datetime
 
-from app.services.hackernews import HackerNewsService, refresh_hackernews_data
+from app.services import hackernews
+from app.services.hackernews import (
+    HackerNewsService,
+    close_http_client,
+    get_http_client,
+    refresh_hackernews_data,
+)
+from app.services.maintenance import check_database_integrity
 
 
 @pytest.fixture
@@ -13,180 +22,259 @@ def mock_db():
     return MagicMock()
 
 
+@pytest.fixture(scope="module")
+def make_response():
+    """Factory for mock HTTP responses returning the given JSON payload."""
+    def _make_response(payload):
+        response = MagicMock(spec=httpx.Response)
+        response.json.return_value = payload
+        return response
+    return _make_response
+
+
+@pytest.fixture(scope="session")
+def http_client(event_loop):
+    """HTTP client shared by the service tests."""
+    client = httpx.AsyncClient()
+    yield client
+    event_loop.run_until_complete(client.aclose())
+
+
 @pytest.fixture
-def hn_service(mock_db):
+def hn_service(mock_db, http_client):
     """HackerNews service with mocked database."""
-    service = HackerNewsService(mock_db)
-    return service
+    return HackerNewsService(mock_db, client=http_client)
 
 
 @pytest.mark.asyncio
-async def test_get_item(hn_service):
+async def test_get_item(hn_service, make_response):
     """Test the get_item method."""
-    mock_response = MagicMock()
-    mock_response.json.return_value = {
+    mock_response = make_response({
         "id": 12345,
         "title": "Test Story",
         "by": "testuser",
         "score": 100,
         "time": 1616161616,
         "type": "story"
-    }
-    mock_response.raise_for_status = AsyncMock()
-    
-    hn_service.client.get = AsyncMock(return_value=mock_response)
+    })
     
-    result = await hn_service.get_item(12345)
+    # The HTTP client is shared across tests, so the stub must be undone afterwards.
+    with patch.object(hn_service.client, "get", AsyncMock(return_value=mock_response)) as mock_get:
+        result = await hn_service.get_item(12345)
     
     assert result["id"] == 12345
     assert result["title"] == "Test Story"
     assert result["score"] == 100
     
-    hn_service.client.get.assert_called_once_with(f"{hn_service.base_url}/item/12345.json")
+    mock_get.assert_called_once_with(f"{hn_service.base_url}/item/12345.json")
 
 
 @pytest.mark.asyncio
-async def test_get_user(hn_service):
+async def test_get_user(hn_service, make_response):
     """Test the get_user method."""
-    mock_response = MagicMock()
-    mock_response.json.return_value = {
+    mock_response = make_response({
         "id": "testuser",
         "karma": 1000,
         "created": 1616161616,
         "about": "Test user"
-    }
-    mock_response.raise_for_status = AsyncMock()
-    
-    hn_service.client.get = AsyncMock(return_value=mock_response)
+    })
     
-    result = await hn_service.get_user("testuser")
+    with patch.object(hn_service.client, "get", AsyncMock(return_value=mock_response)) as mock_get:
+        result = await hn_service.get_user("testuser")
     
     assert result["id"] == "testuser"
     assert result["karma"] == 1000
     assert result["about"] == "Test user"
     
-    hn_service.client.get.assert_called_once_with(f"{hn_service.base_url}/user/testuser.json")
+    mock_get.assert_called_once_with(f"{hn_service.base_url}/user/testuser.json")
 
 
 @pytest.mark.asyncio
-async def test_get_top_stories(hn_service):
+async def test_get_top_stories(hn_service, make_response):
     """Test the get_top_stories method."""
-    mock_response = MagicMock()
-    mock_response.json.return_value = [12345, 67890, 54321, 98765, 13579]
-    mock_response.raise_for_status = AsyncMock()
-    
-    hn_service.client.get = AsyncMock(return_value=mock_response)
+    mock_response = make_response([12345, 67890, 54321, 98765, 13579])
     
-    result = await hn_service.get_top_stories()
+    with patch.object(hn_service.client, "get", AsyncMock(return_value=mock_response)) as mock_get:
+        result = await hn_service.get_top_stories()
     
     assert len(result) == 5
     assert result[0] == 12345
     assert result[4] == 13579
     
-    hn_service.client.get.assert_called_once_with(f"{hn_service.base_url}/topstories.json")
+    mock_get.assert_called_once_with(f"{hn_service.base_url}/topstories.json")
 
 
 @pytest.mark.asyncio
-async def test_process_user(hn_service):
-    """Test the process_user method."""
-    mock_exec_result = MagicMock()
-    mock_exec_result.first.return_value = None
-    hn_service.db.exec = MagicMock(return_value=mock_exec_result)
-    
-    hn_service.get_user = AsyncMock(return_value={
-        "id": "testuser",
-        "karma": 1000,
-        "created": 1616161616,
-        "about": "Test user"
-    })
-    
+async def test_process_user_cached(hn_service):
+    """Test that process_user resolves each username only once."""
     mock_user = MagicMock()
-    mock_user.user_id = 1
-    hn_service.db.add = MagicMock()
-    hn_service.db.commit = MagicMock()
-    hn_service.db.refresh = MagicMock()
+    mock_user.user_id = 7
     
-    with patch("app.services.hackernews.crud.create_user", return_value=mock_user) as mock_create_user:
-        result = await hn_service.process_user("testuser")
+    with patch("app.services.hackernews.crud.get_user_by_username", return_value=mock_user) as mock_get_user:
+        assert await hn_service.process_user("testuser") == 7
+        assert await hn_service.process_user("testuser") == 7
         
-        assert result == 1
-        
-        mock_create_user.assert_called_once()
-        assert mock_create_user.call_args[0][0] == hn_service.db
-        assert mock_create_user.call_args[1]["username"] == "testuser"
-        assert mock_create_user.call_args[1]["karma"] == 1000
+        mock_get_user.assert_called_once_with(hn_service.db, "testuser")
+
+
+_USER_DATA = {
+    "id": "testuser",
+    "karma": 1000,
+    "created": 1616161616,
+    "about": "Test user"
+}
+
+_STORY_DATA = {
+    "id": 12345,
+    "title": "Test Story",
+    "by": "testuser",
+    "score": 100,
+    "time": 1616161616,
+    "type": "story",
+    "url": "https://example.com",
+    "descendants": 10
+}
 
 
 @pytest.mark.asyncio
-async def test_process_story(hn_service):
-    """Test the process_story method."""
-    hn_service.get_item = AsyncMock(return_value={
-        "id": 12345,
-        "title": "Test Story",
-        "by": "testuser",
-        "score": 100,
-        "time": 1616161616,
-        "type": "story",
-        "url": "https://example.com",
-        "descendants": 10
-    })
+@pytest.mark.parametrize(
+    "method, args, kwargs, fetcher, payload, existing_user, crud_target, crud_result, expected, expected_kwargs",
+    [
+        pytest.param(
+            "process_user", ("testuser",), {}, "get_user", _USER_DATA,
+            None, "create_user", MagicMock(user_id=1), 1,
+            {
+                "username": "testuser",
+                "karma": 1000,
+                "created_time": datetime(2021, 3, 19, 13, 46, 56),
+            },
+            id="user",
+        ),
+        pytest.param(
+            "process_story", (12345,), {"is_top": True}, "get_item", _STORY_DATA,
+            MagicMock(user_id=1), "upsert_story", 1, (1, _STORY_DATA),
+            {
+                "hn_id": 12345,
+                "title": "Test Story",
+                "score": 100,
+                "time": datetime(2021, 3, 19, 13, 46, 56),
+                "by_user_id": 1,
+                "is_top": True,
+            },
+            id="story",
+        ),
+    ],
+)
+async def test_process_entity(hn_service, method, args, kwargs, fetcher, payload, existing_user,
+                              crud_target, crud_result, expected, expected_kwargs):
+    """Test that process_user and process_story fetch an item and store it."""
+    setattr(hn_service, fetcher, AsyncMock(return_value=payload))
     
-    hn_service.process_user = AsyncMock(return_value=1)
-    
-    mock_exec_result = MagicMock()
-    mock_exec_result.first.return_value = None
-    hn_service.db.exec = MagicMock(return_value=mock_exec_result)
-    
-    mock_story = MagicMock()
-    mock_story.story_id = 1
-    
-    with patch("app.services.hackernews.crud.create_story", return_value=mock_story) as mock_create_story:
-        result = await hn_service.process_story(12345, is_top=True)
+    with patch("app.services.hackernews.crud.get_user_by_username", return_value=existing_user), \
+            patch(f"app.services.hackernews.crud.{crud_target}", return_value=crud_result) as mock_crud:
+        result = await getattr(hn_service, method)(*args, **kwargs)
         
-        assert result == 1
+        assert result == expected
+        getattr(hn_service, fetcher).assert_called_once_with(*args)
         
-        mock_create_story.assert_called_once()
-        assert mock_create_story.call_args[0][0] == hn_service.db
-        assert mock_create_story.call_args[1]["hn_id"] == 12345
-        assert mock_create_story.call_args[1]["title"] == "Test Story"
-        assert mock_create_story.call_args[1]["score"] == 100
-        assert mock_create_story.call_args[1]["by_user_id"] == 1
-        assert mock_create_story.call_args[1]["is_top"] == True
+        mock_crud.assert_called_once()
+        assert mock_crud.call_args[0][0] == hn_service.db
+        for name, value in expected_kwargs.items():
+            assert mock_crud.call_args[1][name] == value
 
 
 @pytest.mark.asyncio
 async def test_refresh_data(hn_service):
-    """Test the refresh_data method."""
+    """Test that refresh_data fetches everything before writing it in one transaction."""
+    hn_service._run_local_checks = MagicMock(return_value=None)
+    hn_service._check_api_availability = AsyncMock(return_value=None)
     hn_service.get_top_stories = AsyncMock(return_value=[12345, 67890])
     
-    hn_service.process_story = AsyncMock(side_effect=[1, 2])
+    items = {
+        12345: {"id": 12345, "type": "story", "title": "First", "by": "alice", "kids": [1]},
+        67890: {"id": 67890, "type": "story", "title": "Second", "by": "bob", "kids": [2, 3]},
+        1: {"id": 1, "type": "comment", "by": "bob", "text": "Reply"},
+        2: {"id": 2, "type": "comment", "by": "carol", "text": "Another"},
+        3: None,
+    }
+    events = []
     
-    hn_service.process_story_comments = AsyncMock(return_value=5)
+    async def get_item(item_id):
+        events.append("fetch")
+        return items[item_id]
     
-    with patch("app.services.hackernews.crud.mark_top_stories") as mock_mark_top_stories:
-        mock_log = MagicMock()
-        mock_log.refresh_id = 1
-        mock_log.refresh_time = datetime.now()
-        mock_log.stories_refreshed = 2
-        mock_log.comments_refreshed = 10
-        mock_log.status = "success"
-        mock_log.error_message = None
-        
-        with patch("app.services.hackernews.crud.log_refresh", return_value=mock_log) as mock_log_refresh:
-            result = await hn_service.refresh_data()
-            
-            assert result["refresh_id"] == 1
-            assert result["stories_refreshed"] == 2
-            assert result["comments_refreshed"] == 10
-            assert result["status"] == "success"
-            
-            mock_mark_top_stories.assert_called_once_with(hn_service.db, [1, 2])
-            
-            mock_log_refresh.assert_called_once()
-            assert mock_log_refresh.call_args[0][0] == hn_service.db
-            assert mock_log_refresh.call_args[1]["stories_refreshed"] == 2
-            assert mock_log_refresh.call_args[1]["comments_refreshed"] == 10
-            assert mock_log_refresh.call_args[1]["status"] == "success"
+    async def get_user(username):
+        events.append("fetch")
+        return {"id": username, "karma": 1}
+    
+    def write(result):
+        def _write(*args, **kwargs):
+            events.append("write")
+            return result(*args, **kwargs)
+        return _write
+    
+    hn_service.get_item = get_item
+    hn_service.get_user = get_user
+    hn_service.db.commit.side_effect = lambda: events.append("commit")
+    story_ids = iter([1, 2])
+    
+    mock_log = MagicMock()
+    mock_log.refresh_id = 1
+    mock_log.status = "success"
+    
+    with patch("app.services.hackernews.crud.get_user_by_username", return_value=None), \
+            patch("app.services.hackernews.crud.create_user",
+                  side_effect=write(lambda db, username, **kwargs: MagicMock(user_id=len(username)))) as mock_create_user, \
+            patch("app.services.hackernews.crud.upsert_story",
+                  side_effect=write(lambda db, **kwargs: next(story_ids))), \
+            patch("app.services.hackernews.crud.mark_top_stories", side_effect=write(lambda db, ids: None)) as mock_mark, \
+            patch("app.services.hackernews.crud.upsert_comments_bulk",
+                  side_effect=write(lambda db, rows: [row["hn_id"] * 10 for row in rows])), \
+            patch("app.services.hackernews.crud.link_story_comments_bulk",
+                  side_effect=write(lambda db, rows: None)) as mock_link, \
+            patch("app.services.hackernews.crud.log_refresh", return_value=mock_log) as mock_log_refresh:
+        result = await hn_service.refresh_data()
+    
+    assert result["refresh_id"] == 1
+    assert result["status"] == "success"
+    
+    # No write starts before the last fetch, and the writes are committed once.
+    assert "fetch" not in events[events.index("write"):]
+    assert events.count("commit") == 1
+    assert events[-1] == "commit"
+    
+    assert sorted(call.kwargs["username"] for call in mock_create_user.call_args_list) == ["alice", "bob", "carol"]
+    mock_mark.assert_called_once_with(hn_service.db, [1, 2])
+    mock_link.assert_any_call(hn_service.db, [{"story_id": 1, "comment_id": 10, "comment_rank": 0}])
+    mock_link.assert_any_call(hn_service.db, [{"story_id": 2, "comment_id": 20, "comment_rank": 0}])
+    
+    assert mock_log_refresh.call_args[1]["stories_refreshed"] == 2
+    assert mock_log_refresh.call_args[1]["comments_refreshed"] == 2
+    assert mock_log_refresh.call_args[1]["status"] == "success"
+
+
+def test_run_local_checks_cached(hn_service, monkeypatch):
+    """Test that successful pre-refresh checks are skipped until their TTL expires."""
+    monkeypatch.setattr(hackernews, "_local_checks_valid_until", 0.0)
+    hn_service._check_data_dir_access = MagicMock(return_value=None)
+    hn_service._check_database = MagicMock(return_value=None)
+    
+    assert hn_service._run_local_checks() is None
+    assert hn_service._run_local_checks() is None
+    
+    hn_service._check_data_dir_access.assert_called_once()
+    hn_service._check_database.assert_called_once()
+
+
+def test_run_local_checks_failure_not_cached(hn_service, monkeypatch):
+    """Test that failed pre-refresh checks are run again on the next refresh."""
+    monkeypatch.setattr(hackernews, "_local_checks_valid_until", 0.0)
+    hn_service._check_data_dir_access = MagicMock(return_value="missing")
+    
+    assert hn_service._run_local_checks() == "DATA_DIR issue: missing"
+    assert hn_service._run_local_checks() == "DATA_DIR issue: missing"
+    
+    assert hn_service._check_data_dir_access.call_count == 2
 
 
 @pytest.mark.asyncio
@@ -194,7 +282,6 @@ async def test_refresh_hackernews_data(mock_db):
     """Test the refresh_hackernews_data function."""
     mock_service = MagicMock()
     mock_service.refresh_data = AsyncMock(return_value={"status": "success"})
-    mock_service.close = AsyncMock()
     
     with patch("app.services.hackernews.HackerNewsService", return_value=mock_service):
         result = await refresh_hackernews_data(mock_db)
@@ -202,4 +289,27 @@ async def test_refresh_hackernews_data(mock_db):
         assert result["status"] == "success"
         
         mock_service.refresh_data.assert_called_once()
-        mock_service.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_http_client_shared():
+    """Test that services share one HTTP client until it is closed."""
+    client = get_http_client()
+    assert HackerNewsService(MagicMock()).client is client
+    assert get_http_client() is client
+    
+    await close_http_client()
+    assert client.is_closed
+    assert get_http_client() is not client
+    await close_http_client()
+
+
+def test_check_database_integrity(tmp_path):
+    """Test the full integrity check run by the maintenance script."""
+    db_path = tmp_path / "test.db"
+    assert check_database_integrity(db_path) is not None
+    
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.close()
+    assert check_database_integrity(db_path) is None
@@ -1,105 +1,63 @@
 """Comment card component for the Streamlit frontend."""
 import streamlit as st
-from datetime import datetime
-import pytz
-from typing import Dict, Any, List
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 
+from utils.time import format_time
+
+
+def comment_markdown(comment: Dict[str, Any], now: Optional[datetime] = None) -> str:
+    """Build the Markdown for a comment: author and time, text, and a separator."""
+    return (
+        f"**{comment.get('by', 'unknown')}** • "
+        f"{format_time(comment.get('time'), now)}\n\n"
+        f"{comment.get('text') or '*[deleted]*'}\n\n"
+        "---"
+    )
 
-def format_time(timestamp: str) -> str:
-    """Format timestamp as relative time."""
-    if not timestamp:
-        return "Unknown time"
-    
-    dt = datetime.fromisoformat(timestamp)
-    now = datetime.now(pytz.UTC)
-    
-    if dt.tzinfo is None:
-        dt = pytz.UTC.localize(dt)
-    
-    diff = now - dt
-    
-    if diff.days > 365:
-        years = diff.days // 365
-        return f"{years} year{'s' if years > 1 else ''} ago"
-    elif diff.days > 30:
-        months = diff.days // 30
-        return f"{months} month{'s' if months > 1 else ''} ago"
-    elif diff.days > 0:
-        return f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
-    elif diff.seconds > 3600:
-        hours = diff.seconds // 3600
-        return f"{hours} hour{'s' if hours > 1 else ''} ago"
-    elif diff.seconds > 60:
-        minutes = diff.seconds // 60
-        return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-    else:
-        return "just now"
 
+def _quote(markdown: str, level: int) -> str:
+    """Indent Markdown by nesting it ``level`` blockquotes deep."""
+    if level == 0:
+        return markdown
+    prefix = "> " * level
+    return "\n".join(prefix + line for line in markdown.split("\n"))
 
-def comment_card(comment: Dict[str, Any], level: int = 0):
-    """Display a comment card with proper indentation based on level."""
-    indent = level * 20  # 20px per level
+
+def comment_card(comment: Dict[str, Any], level: int = 0, now: Optional[datetime] = None):
+    """Display a comment card with proper indentation based on level.
     
-    with st.container():
-        if indent > 0:
-            cols = st.columns([indent, 1000 - indent])
-            container = cols[1]
-            
-            with container:
-                container.markdown(
-                    f"**{comment.get('by', 'unknown')}** • "
-                    f"{format_time(comment.get('time'))}"
-                )
-                
-                if comment.get("text"):
-                    container.markdown(comment.get("text"))
-                else:
-                    container.markdown("*[deleted]*")
-                
-                container.markdown("---")
-        else:
-            st.markdown(
-                f"**{comment.get('by', 'unknown')}** • "
-                f"{format_time(comment.get('time'))}"
-            )
-            
-            if comment.get("text"):
-                st.markdown(comment.get("text"))
-            else:
-                st.markdown("*[deleted]*")
-            
-            st.markdown("---")
+    The card is a single Markdown element, so it needs no container of its own.
+    """
+    st.markdown(_quote(comment_markdown(comment, now), level))
 
 
 def comment_thread(comments: List[Dict[str, Any]]):
-    """Display a thread of comments with proper nesting."""
-    comment_dict = {}
-    for comment in comments:
-        comment_id = comment.get("id")
-        comment_dict[comment_id] = {
-            "comment": comment,
-            "children": []
-        }
+    """Display a thread of comments with proper nesting.
     
-    root_comments = []
-    for comment_id, comment_data in comment_dict.items():
-        comment = comment_data["comment"]
+    Comments whose parent is not in the list are shown at the top level. Siblings
+    keep their order from the input. The whole thread is sent as one Markdown
+    element, with replies indented as nested blockquotes.
+    """
+    now = datetime.now(timezone.utc)
+    
+    comment_by_id = {comment.get("id"): comment for comment in comments}
+    children = defaultdict(list)
+    roots = []
+    for comment in comments:
         parent_id = comment.get("parent_id")
-        
-        if parent_id in comment_dict:
-            comment_dict[parent_id]["children"].append(comment_id)
+        if parent_id in comment_by_id:
+            children[parent_id].append(comment)
         else:
-            root_comments.append(comment_id)
+            roots.append(comment)
     
-    def display_comment_tree(comment_id, level=0):
-        if comment_id not in comment_dict:
-            return
-        
-        comment_data = comment_dict[comment_id]
-        comment_card(comment_data["comment"], level)
-        
-        for child_id in comment_data["children"]:
-            display_comment_tree(child_id, level + 1)
+    # Depth-first with an explicit stack, so deep threads can't hit the recursion limit.
+    parts = []
+    stack = [(comment, 0) for comment in reversed(roots)]
+    while stack:
+        comment, level = stack.pop()
+        parts.append(_quote(comment_markdown(comment, now), level))
+        stack.extend((child, level + 1) for child in reversed(children[comment.get("id")]))
     
-    for root_id in root_comments:
-        display_comment_tree(root_id)
+    st.markdown("\n\n".join(parts))
@@ -1,9 +1,15 @@
 """Main Streamlit application."""
 import streamlit as st
 import asyncio
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:  # Not available on Windows.
+    uvloop = None
+
 from components.story_card import story_card
 from components.comment_card import comment_thread
 from utils.api import (
@@ -39,6 +45,60 @@ def go_home():
     st.session_state.selected_story = None
 
 
+@st.cache_resource
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Start the event loop shared by all reruns and sessions.
+
+    The loop runs on its own thread, so script runs on different threads can
+    submit work to it concurrently, and the API client's connections live on.
+    uvloop is used when it is installed.
+    """
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="api-event-loop", daemon=True).start()
+    return loop
+
+
+def run_async(coro):
+    """Run a coroutine on the shared event loop and return its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+@st.cache_data(ttl=10, show_spinner=False)
+def cached_status():
+    """Get the system status, reusing the last response for a few seconds."""
+    return run_async(get_system_status())
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_top_stories(limit: int, refresh_id=None):
+    """Get the top stories, reusing the last response for half a minute.
+
+    ``refresh_id`` is the last data refresh's ID from the system status; it is
+    only part of the cache key, so a finished refresh is picked up at once.
+    """
+    return run_async(get_top_stories(limit=limit))
+
+
+async def _prefetch_story_details(story_ids):
+    await asyncio.gather(
+        *(get_story(story_id) for story_id in story_ids),
+        *(get_story_comments(story_id, limit=10) for story_id in story_ids),
+        return_exceptions=True,
+    )
+
+
+def prefetch_story_details(story_ids):
+    """Warm the API cache for stories likely to be opened next, without waiting."""
+    asyncio.run_coroutine_threadsafe(_prefetch_story_details(story_ids), get_loop())
+
+
+def load_status():
+    try:
+        return cached_status()
+    except Exception as e:
+        return {"status": "error", "last_refresh": None, "error": str(e)}
+
+
 with st.sidebar:
     st.title("Navigation")
     
@@ -49,14 +109,10 @@ with st.sidebar:
     
     st.subheader("System Status")
     
-    async def load_status():
-        try:
-            return await get_system_status()
-        except Exception as e:
-            st.error(f"Error loading system status: {str(e)}")
-            return {"status": "error", "last_refresh": None}
+    status = load_status()
     
-    status = asyncio.run(load_status())
+    if "error" in status:
+        st.error(f"Error loading system status: {status['error']}")
     
     if status["status"] == "ok":
         st.success("System: Online")
@@ -71,14 +127,19 @@ with st.sidebar:
     else:
         st.write("No refresh data available")
     
-    if st.button("Refresh Data", use_container_width=True):
+    # The refresh runs in the background on the backend, so nothing is refetched
+    # in this rerun: data loaded now would still be from before the refresh.
+    refresh_triggered = st.button("Refresh Data", use_container_width=True)
+    if refresh_triggered:
         try:
-            result = asyncio.run(trigger_refresh())
+            result = run_async(trigger_refresh())
+            cached_status.clear()
+            get_story.cache_clear()
+            get_story_comments.cache_clear()
             st.session_state.refresh_status = "Refresh started"
             st.success("Refresh started")
             
-            updated_status = asyncio.run(load_status())
-            if updated_status["status"] == "ok":
+            if status["status"] == "ok":
                 st.session_state.refresh_status = None  # Clear error message on successful refresh
         except Exception as e:
             st.session_state.refresh_status = f"Error: {str(e)}"
@@ -88,18 +149,20 @@ with st.sidebar:
 if st.session_state.view == "home":
     st.header("Top Stories")
     
-    async def load_stories():
-        try:
-            return await get_top_stories(limit=5)
-        except Exception as e:
-            st.error(f"Error loading stories: {str(e)}")
-            return []
-    
-    stories = asyncio.run(load_stories())
+    try:
+        last_refresh = status.get("last_refresh") or {}
+        stories = cached_top_stories(5, last_refresh.get("refresh_id"))
+    except Exception as e:
+        st.error(f"Error loading stories: {str(e)}")
+        stories = []
     
     if stories:
+        now = datetime.now(timezone.utc)
         for story in stories:
-            story_card(story)
+            story_card(story, now=now)
+        
+        if not refresh_triggered:
+            prefetch_story_details([story["id"] for story in stories[:3]])
     else:
         st.info("No stories available. Try refreshing the data.")
 
@@ -109,16 +172,18 @@ elif st.session_state.view == "story_detail":
             go_home()
             st.rerun()
         
-        async def load_story_detail():
-            try:
-                story = await get_story(st.session_state.selected_story)
-                comments = await get_story_comments(st.session_state.selected_story, limit=10)
-                return story, comments
-            except Exception as e:
-                st.error(f"Error loading story details: {str(e)}")
-                return None, []
+        async def load_story_detail(story_id):
+            return await asyncio.gather(
+                get_story(story_id),
+                get_story_comments(story_id, limit=10),
+            )
         
-        story, comments = asyncio.run(load_story_detail())
+        # Streamlit calls only work on the script thread, not on the loop's.
+        try:
+            story, comments = run_async(load_story_detail(st.session_state.selected_story))
+        except Exception as e:
+            st.error(f"Error loading story details: {str(e)}")
+            story, comments = None, []
         
         if story:
             story_card(story, show_comments_button=False)
@@ -1,57 +1,139 @@
 """API client for the HackerNews Viewer backend."""
+import asyncio
+import functools
+import importlib.util
 import os
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Optional, Tuple
 import httpx
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
 
 API_URL = os.getenv("API_URL", "http://localhost:8000/api")
 
+# HTTP/2 needs the optional h2 package (the httpx[http2] extra).
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the HTTP client shared by all API calls.
+
+    Reusing one client keeps connections to the backend alive between calls.
+    A client's connections belong to the event loop they were opened on, so a
+    new client is created when called from a different loop.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # Bounded waits and connections keep a slow backend from stalling every
+        # rerun; retries only cover failures to connect, so they are safe for POSTs.
+        _client = httpx.AsyncClient(
+            base_url=API_URL,
+            timeout=httpx.Timeout(5.0, connect=2.0),
+            transport=httpx.AsyncHTTPTransport(
+                http2=_HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                retries=2,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+def _ttl_cache(maxsize: int, ttl: float):
+    """Cache a coroutine function's results for ``ttl`` seconds.
+
+    At most ``maxsize`` results are kept, evicting the least recently used. The
+    decorated function gets a ``cache_clear()`` method. Failed calls are not cached.
+
+    Calls run on the shared event loop, but ``cache_clear()`` is called from
+    script threads, so the entries are only touched while holding a lock.
+    """
+    def decorator(func):
+        entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    entries.move_to_end(key)
+                    return entry[1]
+
+            result = await func(*args, **kwargs)
+            with lock:
+                entries[key] = (time.monotonic() + ttl, result)
+                entries.move_to_end(key)
+                if len(entries) > maxsize:
+                    entries.popitem(last=False)
+            return result
+
+        def cache_clear() -> None:
+            with lock:
+                entries.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client, if one is open."""
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
+
 
 async def get_top_stories(limit: int = 5) -> List[Dict[str, Any]]:
     """Get top stories from the API."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_URL}/stories/top?limit={limit}")
-        response.raise_for_status()
-        return response.json()
+    response = await get_client().get("/stories/top", params={"limit": limit})
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
 
+@_ttl_cache(maxsize=64, ttl=30)
 async def get_story(story_id: int) -> Dict[str, Any]:
     """Get a specific story from the API."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_URL}/stories/{story_id}")
-        response.raise_for_status()
-        return response.json()
+    response = await get_client().get(f"/stories/{story_id}")
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
 
+@_ttl_cache(maxsize=64, ttl=30)
 async def get_story_comments(story_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Get comments for a specific story from the API."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_URL}/stories/{story_id}/comments?limit={limit}")
-        response.raise_for_status()
-        return response.json()
+    response = await get_client().get(f"/stories/{story_id}/comments", params={"limit": limit})
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
 
 async def get_user(username: str) -> Dict[str, Any]:
     """Get a user from the API."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_URL}/users/{username}")
-        response.raise_for_status()
-        return response.json()
+    response = await get_client().get(f"/users/{username}")
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
 
 async def get_system_status() -> Dict[str, Any]:
     """Get system status from the API."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_URL}/system/status")
-        response.raise_for_status()
-        return response.json()
+    response = await get_client().get("/system/status")
+    response.raise_for_status()
+    return orjson.loads(response.content)
 
 
 async def trigger_refresh() -> Dict[str, Any]:
     """Trigger a manual refresh of the data."""
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{API_URL}/system/refresh")
-        response.raise_for_status()
-        return response.json()
+    response = await get_client().post("/system/refresh")
+    response.raise_for_status()
+    return orjson.loads(response.content)
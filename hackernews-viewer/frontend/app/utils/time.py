@@ -0,0 +1,44 @@
+"""Time formatting helpers for the Streamlit frontend."""
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp(timestamp: str) -> datetime:
+    """Parse an ISO timestamp into an aware datetime, assuming UTC if naive."""
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def format_time(timestamp: str, now: Optional[datetime] = None) -> str:
+    """Format timestamp as relative time.
+    
+    Pass ``now`` when formatting many timestamps so the clock is read once.
+    """
+    if not timestamp:
+        return "Unknown time"
+    
+    if now is None:
+        now = datetime.now(timezone.utc)
+    
+    diff = now - _parse_timestamp(timestamp)
+    
+    if diff.days > 365:
+        years = diff.days // 365
+        return f"{years} year{'s' if years > 1 else ''} ago"
+    elif diff.days > 30:
+        months = diff.days // 30
+        return f"{months} month{'s' if months > 1 else ''} ago"
+    elif diff.days > 0:
+        return f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
+    elif diff.seconds > 3600:
+        hours = diff.seconds // 3600
+        return f"{hours} hour{'s' if hours > 1 else ''} ago"
+    elif diff.seconds > 60:
+        minutes = diff.seconds // 60
+        return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+    else:
+        return "just now"
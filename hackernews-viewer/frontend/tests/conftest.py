@@ -0,0 +1,6 @@
+"""Test configuration for the HackerNews Viewer frontend."""
+import os
+import sys
+
+# Streamlit runs app/main.py with app/ on the path, which the components rely on.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
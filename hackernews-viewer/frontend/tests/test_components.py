@@ -2,16 +2,16 @@
 import pytest
 from unittest.mock import patch, MagicMock
 import streamlit as st
-from datetime import datetime
-import pytz
+from datetime import datetime, timezone
 
-from app.components.story_card import story_card, format_time
+from app.components.story_card import story_card
 from app.components.comment_card import comment_card, comment_thread
+from app.utils.time import format_time
 
 
 def test_format_time():
     """Test the format_time function."""
-    now = datetime.now(pytz.UTC)
+    now = datetime.now(timezone.utc)
     
     assert format_time(now.isoformat()) == "just now"
     
@@ -45,7 +45,7 @@ def test_story_card(mock_expander, mock_button, mock_metric, mock_markdown, mock
         "url": "https://example.com",
         "score": 100,
         "by": "testuser",
-        "time": datetime.now(pytz.UTC).isoformat(),
+        "time": datetime.now(timezone.utc).isoformat(),
         "descendants": 10,
         "text": "This is a test story"
     }
@@ -53,9 +53,12 @@ def test_story_card(mock_expander, mock_button, mock_metric, mock_markdown, mock
     story_card(story)
     
     mock_container.assert_called()
-    mock_columns.assert_called()
-    mock_markdown.assert_called()
-    mock_metric.assert_called_with("Score", 100)
+    mock_columns.assert_not_called()
+    mock_metric.assert_not_called()
+    header = mock_markdown.call_args_list[0].args[0]
+    assert "[Test Story](https://example.com)" in header
+    assert "**100** points" in header
+    assert "**testuser**" in header
     mock_button.assert_called()
 
 
@@ -68,25 +71,26 @@ def test_comment_card(mock_markdown, mock_columns, mock_container):
         "id": 1,
         "text": "This is a test comment",
         "by": "testuser",
-        "time": datetime.now(pytz.UTC).isoformat(),
+        "time": datetime.now(timezone.utc).isoformat(),
         "level": 0
     }
     
     comment_card(comment)
     
-    mock_container.assert_called()
-    mock_markdown.assert_called()
+    mock_container.assert_not_called()
+    mock_markdown.assert_called_once()
 
 
-@patch("app.components.comment_card.comment_card")
-def test_comment_thread(mock_comment_card):
+@patch("streamlit.markdown")
+@patch("app.components.comment_card.comment_markdown", return_value="")
+def test_comment_thread(mock_comment_markdown, mock_markdown):
     """Test the comment_thread function."""
     comments = [
         {
             "id": 1,
             "text": "Top level comment",
             "by": "user1",
-            "time": datetime.now(pytz.UTC).isoformat(),
+            "time": datetime.now(timezone.utc).isoformat(),
             "level": 0,
             "parent_id": None
         },
@@ -94,7 +98,7 @@ def test_comment_thread(mock_comment_card):
             "id": 2,
             "text": "Reply to top level",
             "by": "user2",
-            "time": datetime.now(pytz.UTC).isoformat(),
+            "time": datetime.now(timezone.utc).isoformat(),
             "level": 1,
             "parent_id": 1
         }
@@ -102,4 +106,22 @@ def test_comment_thread(mock_comment_card):
     
     comment_thread(comments)
     
-    assert mock_comment_card.call_count >= 1
+    assert mock_comment_markdown.call_count >= 1
+    mock_markdown.assert_called_once()
+
+
+@patch("streamlit.markdown")
+@patch("app.components.comment_card.comment_markdown", side_effect=lambda c, now: str(c["id"]))
+def test_comment_thread_nesting(mock_comment_markdown, mock_markdown):
+    """Test that comment_thread renders replies under their parents in order."""
+    comments = [
+        {"id": 1, "parent_id": None},
+        {"id": 2, "parent_id": 1},
+        {"id": 3, "parent_id": 99},
+        {"id": 4, "parent_id": 2},
+        {"id": 5, "parent_id": 1},
+    ]
+    
+    comment_thread(comments)
+    
+    mock_markdown.assert_called_once_with("1\n\n> 2\n\n> > 4\n\n> 5\n\n3")